@@ -1,54 +1,24 @@
+import os
+import re
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from pathlib import Path
-import requests
-from datetime import datetime
-
-# ========================
-# COLETA DE DADOS VIA API
-# ========================
 
-@st.cache_data(ttl=86400)  # Cache por 24 horas
-def fetch_data_from_api():
-    """
-    Busca dados de vendas de VEs da API do Our World in Data
-    e salva localmente em CSV
-    """
-    data_dir = Path(__file__).parent.parent / "data"
-    data_dir.mkdir(exist_ok=True)
-    csv_path = data_dir / "ev_sales_global.csv"
-    
-    # Se arquivo já existe e é recente (menos de 7 dias), usar cache local
-    if csv_path.exists():
-        file_age_days = (datetime.now().timestamp() - csv_path.stat().st_mtime) / 86400
-        if file_age_days < 7:
-            return pd.read_csv(csv_path)
-    
-    # Buscar dados da API
-    try:
-        # URL da API do OWID para dados de carros elétricos
-        api_url = "https://github.com/owid/owid-datasets/raw/master/datasets/Electric%20car%20sales%20-%20by%20country/Electric%20car%20sales%20-%20by%20country.csv"
-        
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        
-        # Salvar dados brutos
-        with open(csv_path, 'wb') as f:
-            f.write(response.content)
-        
-        # Carregar e retornar DataFrame
-        df = pd.read_csv(csv_path)
-        return df
-        
-    except requests.RequestException as e:
-        # Fallback: tentar carregar arquivo local existente
-        if csv_path.exists():
-            return pd.read_csv(csv_path)
-        else:
-            st.error("Não foi possível obter os dados. Verifique sua conexão com a internet.")
-            st.stop()
+from ev_dashboard.analytics import (
+    DEFAULT_COUNTRIES, DEFAULT_PERIOD_STARTS, DEFAULT_ROLLING_WINDOW, DEFAULT_YEAR_START, compare_entities,
+    dataset_info, filter_rows, get_countries_list, get_global_trend, get_metrics, get_regions, get_summary_stats,
+    get_year_range, growth_table, metric_table, page_rows, page_slice, period_buckets, rolling_windows
+)
+from ev_dashboard.data import CSV_PATH, DATA_DIR
+from ev_dashboard.export import EXPORT_FORMATS, export_file, export_name, export_unavailable
+from ev_dashboard.figures import (
+    FigureCache, build_comparison_heatmap_figure, build_comparison_line_figure,
+    build_global_trend_figure, build_market_share_figure, build_periods_figure,
+    build_projection_figure, build_rolling_figure, build_top10_figure, figure_key
+)
+from ev_dashboard.forecast import DEFAULT_HORIZON, MODELS, growth_metrics, projection_frame
+from ev_dashboard.instrumentation import REGISTRY, ProfileCapture, Tracer
+from ev_dashboard.store import DataRefresher, read_changelog
 
 st.set_page_config(
     page_title="Dashboard Vendas VE",
@@ -56,6 +26,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Painel de tempos: ?debug=1 na URL ou EV_DASHBOARD_DEBUG=1
+DEBUG = os.environ.get("EV_DASHBOARD_DEBUG") == "1" or st.query_params.get("debug") == "1"
+# Histogramas no formato do Prometheus gravados a cada execução (ex.: textfile collector)
+METRICS_FILE = os.environ.get("EV_DASHBOARD_METRICS_FILE")
+# Tabelas: 'arrow' envia só os dados (Arrow) e o navegador formata os números;
+# 'styler' formata no servidor com o pandas Styler (HTML/estilos por célula a cada rerun)
+TABLE_FORMAT = os.environ.get("EV_DASHBOARD_TABLE_FORMAT", "arrow")
+
+tracer = Tracer()
+
 st.markdown("""
 <style>
     /* Modo escuro */
@@ -167,99 +147,168 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_resource
+def get_refresher():
+    refresher = DataRefresher()
+    # Dados antigos: revalida já, em segundo plano, sem bloquear esta sessão
+    if refresher.is_stale():
+        refresher.request_refresh()
+    return refresher
+
+
 def load_and_process_data():
-    """Carrega dados da API e aplica processamento/limpeza"""
-    df = fetch_data_from_api()
-    
-    # Limpeza de dados
-    df = df.dropna(subset=['Electric cars sold']).copy()
-    df['Electric cars sold'] = df['Electric cars sold'].astype(int)
-    
-    return df
+    """Dataset atual (matriz Entity×Year) mantido pelo refresher em segundo plano"""
+    data = get_refresher().current()
+    if data is None:
+        st.error("Não foi possível obter os dados. Verifique sua conexão com a internet.")
+        st.stop()
+    return data
 
 @st.cache_resource
 def load_data():
     """DEPRECADO - usar load_and_process_data() que busca da API"""
-    data_path = Path(__file__).parent.parent / "data" / "ev_sales_global.csv"
-    df = pd.read_csv(data_path)
+    df = pd.read_csv(CSV_PATH)
     df = df.dropna(subset=['Electric cars sold']).copy()
     df['Electric cars sold'] = df['Electric cars sold'].astype(int)
     return df
 
-def get_global_trend(df):
-    return df[df['Entity'] == 'World'].sort_values('Year')
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
 
-def get_top_countries(df, year=None, top_n=10):
-    df_countries = df[~df['Entity'].isin(['World', 'Europe', 'Rest of World', 'European Union (27)'])]
-    if year is None:
-        return df_countries.groupby('Entity')['Electric cars sold'].sum().sort_values(ascending=False).head(top_n)
-    else:
-        year_data = df_countries[df_countries['Year'] == year]
-        return year_data.groupby('Entity')['Electric cars sold'].sum().sort_values(ascending=False).head(top_n)
-
-def get_country_data(df, country):
-    return df[df['Entity'] == country].sort_values('Year')
-
-def get_countries_list(df):
-    df_countries = df[~df['Entity'].isin(['World', 'Europe', 'Rest of World', 'European Union (27)'])]
-    return sorted(df_countries['Entity'].unique().tolist())
-
-def get_year_range(df):
-    return int(df['Year'].min()), int(df['Year'].max())
-
-def get_summary_stats(df):
-    world_data = get_global_trend(df)
-    yearly_growth = world_data['Electric cars sold'].pct_change().dropna()
-    avg_growth = yearly_growth.mean() * 100 if len(yearly_growth) > 0 else 0
-    
-    return {
-        'total_sales': int(df['Electric cars sold'].sum()),
-        'countries': df[~df['Entity'].isin(['World', 'Europe', 'Rest of World', 'European Union (27)'])]['Entity'].nunique(),
-        'year_min': int(df['Year'].min()),
-        'year_max': int(df['Year'].max()),
-        'avg_annual_growth': avg_growth
-    }
 
-df = load_and_process_data()
-min_year, max_year = get_year_range(df)
+CHANGE_LABELS = {'added': 'novas', 'changed': 'alteradas', 'removed': 'removidas'}
 
-st.markdown("""
-<div style='text-align: center; padding: 2rem 0; background: #1e293b; border-radius: 12px; margin-bottom: 2rem; border: 1px solid #334155;'>
-    <h1 style='font-size: 2.5rem; margin-bottom: 0.5rem; color: #f8fafc;'>Dashboard de Vendas de Veículos Elétricos</h1>
-    <p style='font-size: 1rem; color: #94a3b8; margin: 0;'>
-        Análise global de vendas de veículos elétricos • 2010-2023 • Dados via API OWID
-    </p>
-</div>
-""", unsafe_allow_html=True)
 
-st.sidebar.markdown("""
-<div style='text-align: center; padding: 2rem 0 1.5rem 0; border-bottom: 1px solid #334155;'>
-    <h2 style='font-size: 1.5rem; margin: 0; font-weight: 700;'>Filtros</h2>
-</div>
-""", unsafe_allow_html=True)
+def render_sidebar():
+    """Carrega os dados e desenha o cabeçalho e os filtros; retorna (dados, países, período)"""
+    with tracer.span("data_load"):
+        data = load_and_process_data()
+        # Versão nova aplicada como delta: figuras de entidades inalteradas seguem válidas
+        get_figure_cache().migrate(data)
+    min_year, max_year = get_year_range(data)
 
-selected_countries = st.sidebar.multiselect(
-    "Países para comparar:",
-    options=get_countries_list(df),
-    default=["China", "United States", "Germany"],
-    help="Selecione até 5 países para comparação detalhada"
-)
+    st.markdown("""
+    <div style='text-align: center; padding: 2rem 0; background: #1e293b; border-radius: 12px; margin-bottom: 2rem; border: 1px solid #334155;'>
+        <h1 style='font-size: 2.5rem; margin-bottom: 0.5rem; color: #f8fafc;'>Dashboard de Vendas de Veículos Elétricos</h1>
+        <p style='font-size: 1rem; color: #94a3b8; margin: 0;'>
+            Análise global de vendas de veículos elétricos • 2010-2023 • Dados via API OWID
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
 
-year_range = st.sidebar.slider(
-    "Período de análise:",
-    min_year,
-    max_year,
-    (2015, max_year)
-)
+    st.sidebar.markdown("""
+    <div style='text-align: center; padding: 2rem 0 1.5rem 0; border-bottom: 1px solid #334155;'>
+        <h2 style='font-size: 1.5rem; margin: 0; font-weight: 700;'>Filtros</h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    region = st.sidebar.selectbox(
+        "Região:",
+        [None, *get_regions(data)],
+        format_func=lambda r: "Todos os países" if r is None else r,
+        help="Restringe a lista de países aos membros de uma região agregada"
+    )
+    region_countries = get_countries_list(data, region)
+    compare_all = st.sidebar.checkbox(
+        "Comparar todos os países",
+        help="Inclui todos os países da região selecionada na comparação"
+    )
+    selected_countries = st.sidebar.multiselect(
+        "Países para comparar:",
+        options=region_countries,
+        default=[c for c in DEFAULT_COUNTRIES if c in region_countries],
+        help="Selecione os países para comparação detalhada; com muitos países a trajetória vira um mapa de calor",
+        disabled=compare_all
+    )
+    if compare_all:
+        selected_countries = region_countries
+
+    year_range = st.sidebar.slider(
+        "Período de análise:",
+        min_year,
+        max_year,
+        (DEFAULT_YEAR_START, max_year)
+    )
+
+    # Botão para forçar atualização dos dados
+    if st.sidebar.button("Atualizar Dados da API"):
+        get_refresher().request_refresh()
 
-# Botão para forçar atualização dos dados
-if st.sidebar.button("Atualizar Dados da API"):
-    st.cache_data.clear()
-    st.rerun()
+    refresher = get_refresher()
+    data_age = refresher.data_age()
+    if data_age is not None:
+        age_hours = data_age.total_seconds() / 3600
+        age_text = f"{age_hours:.0f} h" if age_hours < 48 else f"{age_hours / 24:.0f} dias"
+        st.sidebar.caption(f"Dados verificados há {age_text}")
+    if refresher.is_refreshing():
+        st.sidebar.caption("🔄 Atualizando em segundo plano… os dados atuais seguem disponíveis")
+    elif refresher.status == 'error':
+        st.sidebar.caption(f"⚠️ Falha na última atualização: {refresher.last_error}")
+    if refresher.dataset_errors:
+        st.sidebar.caption("⚠️ Indicadores não atualizados: " + ", ".join(sorted(refresher.dataset_errors)))
 
-tab1, tab2, tab3, tab4 = st.tabs(["Visão Geral", "Tendências", "Comparação", "Dados"])
+    changelog = read_changelog(CSV_PATH, limit=5)
+    if changelog:
+        with st.sidebar.expander("📝 Últimas atualizações dos dados"):
+            for entry in changelog:
+                counts = ", ".join(
+                    f"{n} {CHANGE_LABELS.get(kind, kind)}" for kind, n in entry['counts'].items()
+                ) or "sem alterações"
+                st.markdown(f"**{entry['time'].replace('T', ' ')}** — {counts}")
+                if entry['largest']:
+                    moves = "; ".join(
+                        f"{m['Entity']} {m['Year']}: {m['before']:,} → {m['after']:,}" for m in entry['largest'][:3]
+                    )
+                    st.caption(moves)
+
+    figure_stats = get_figure_cache().stats()
+    st.sidebar.caption(
+        f"Cache de gráficos: {figure_stats['hits']} acertos • {figure_stats['misses']} falhas "
+        f"({figure_stats['entries']} figuras)"
+    )
+
+    return data, selected_countries, year_range
+
+
+def render_timings(tracer, label):
+    """Tabela com o tempo de cada span de um trace e o total"""
+    timings = pd.DataFrame(
+        [{'Etapa': '· ' * depth + name, 'ms': duration * 1000} for name, depth, duration in tracer.spans]
+    )
+    st.dataframe(timings, hide_index=True, use_container_width=True)
+    st.caption(f"{label}: {tracer.total() * 1000:.1f} ms")
+
+
+def render_debug_panel(tracer):
+    """Tempos de cada etapa da execução completa, exportação dos histogramas e perfil opcional"""
+    with st.sidebar.expander("⏱️ Tempos da última execução completa", expanded=True):
+        render_timings(tracer, "Total do script")
+
+        st.download_button(
+            "Exportar histogramas (Prometheus)",
+            REGISTRY.to_prometheus(),
+            file_name="ev_dashboard.prom",
+            mime="text/plain"
+        )
+        st.button(
+            "Perfilar próxima execução",
+            on_click=lambda: st.session_state.update(profile_next=True),
+            help="cProfile + tracemalloc em uma única execução (mais lenta)"
+        )
+
+        report = st.session_state.get('profile_report')
+        if report:
+            st.caption(f"Perfil gravado em {report['prof_path']} • pico de alocação {report['peak_alloc_mb']:.1f} MB")
+            st.code(report['profile'], language=None)
+            st.code("\n".join(report['allocations']), language=None)
+
+
+# ========================
+# ABAS
+# ========================
+# Cada aba é uma função de renderização: só a aba ativa executa (ver final do arquivo)
 
-with tab1:
+def render_overview(data):
     st.markdown("""
     <div style='background: #1e293b; padding: 1.5rem; border-radius: 8px; margin-bottom: 1.5rem; border: 1px solid #334155;'>
         <h2 style='color: #f8fafc; margin: 0 0 0.5rem 0; font-size: 1.5rem;'>Visão Geral Global</h2>
@@ -269,8 +318,8 @@ with tab1:
     </div>
     """, unsafe_allow_html=True)
     
-    stats = get_summary_stats(df)
-    world_data = get_global_trend(df)
+    stats = get_summary_stats(data)
+    world_data = get_global_trend(data)
     latest_year = world_data.iloc[-1]
     prev_year = world_data.iloc[-2]
     growth_last_year = ((latest_year['Electric cars sold'] - prev_year['Electric cars sold']) / prev_year['Electric cars sold'] * 100)
@@ -295,51 +344,27 @@ with tab1:
     col4.metric(
         "Crescimento Médio Anual", 
         f"{stats['avg_annual_growth']:.1f}%",
-        help="Taxa média de crescimento ano a ano desde 2010"
+        help="Taxa de crescimento anual composta (CAGR) das vendas globais desde 2010"
     )
     
     st.markdown("<br>", unsafe_allow_html=True)
     st.subheader("Top 10 Mercados de Veículos Elétricos (2010-2023)")
     st.caption("Líderes de mercado impulsionando a transição para mobilidade elétrica")
     
-    top_10 = get_top_countries(df, top_n=10)
-    total_top10 = top_10.sum()
-    china_share = (top_10.iloc[0] / total_top10 * 100) if len(top_10) > 0 else 0
-    
-    colors = ['#3b82f6' if i == 0 else '#60a5fa' if i < 3 else '#93c5fd' for i in range(len(top_10))]
-    
-    fig = go.Figure(data=[go.Bar(
-        x=top_10.values, 
-        y=top_10.index, 
-        orientation='h',
-        marker=dict(color=colors),
-        text=[f"{val:,}" for val in top_10.values],
-        textposition='outside',
-        textfont=dict(size=11, color='#f8fafc', family='Arial')
-    )])
-    fig.update_layout(
-        xaxis_title="Total de Vendas (unidades)",
-        yaxis_title="",
-        height=450,
-        template="plotly_dark",
-        title=dict(
-            text=f"China representa {china_share:.1f}% do Top 10",
-            font=dict(size=13, color='#cbd5e1')
-        ),
-        plot_bgcolor='#0f172a',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=20, r=20, t=60, b=20),
-        font=dict(color='#cbd5e1')
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    with tracer.span("chart:top10"):
+        fig, extras = get_figure_cache().get_or_build(
+            figure_key(data, 'top10'), lambda: build_top10_figure(data)
+        )
+        st.plotly_chart(fig, use_container_width=True)
     
     col1, col2 = st.columns(2)
     with col1:
-        st.info(f"China lidera com {top_10.iloc[0]:,} vendas, mais que os próximos 5 países combinados")
+        st.info(f"China lidera com {extras['leader_sales']:,} vendas, mais que os próximos 5 países combinados")
     with col2:
-        st.info(f"À uma grande concentração de mercado onde o Top 3 países representam 70%+ das vendas globais")
+        st.info("À uma grande concentração de mercado onde o Top 3 países representam 70%+ das vendas globais")
 
-with tab2:
+
+def render_trends(data):
     st.markdown("""
     <div style='background: #1e293b; padding: 1.5rem; border-radius: 8px; margin-bottom: 1.5rem; border: 1px solid #334155;'>
         <h2 style='color: #f8fafc; margin: 0 0 0.5rem 0; font-size: 1.5rem;'>Evolução Temporal e Tendências</h2>
@@ -349,54 +374,13 @@ with tab2:
     </div>
     """, unsafe_allow_html=True)
     
-    world_data = get_global_trend(df)
-    first_year_sales = world_data.iloc[0]['Electric cars sold']
-    last_year_sales = world_data.iloc[-1]['Electric cars sold']
-    total_growth = ((last_year_sales - first_year_sales) / first_year_sales * 100)
-    
-    st.markdown(f"**Crescimento Total:** {first_year_sales:,} (2010) → {last_year_sales:,} (2023) = **+{total_growth:,.0f}%**")
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=world_data['Year'],
-        y=world_data['Electric cars sold'],
-        mode='lines+markers',
-        name='Vendas Anuais',
-        line=dict(color='#3b82f6', width=3),
-        marker=dict(size=8, color='#60a5fa'),
-        fill='tozeroy',
-        fillcolor='rgba(59,130,246,0.1)',
-        hovertemplate='<b>Ano %{x}</b><br>Vendas: %{y:,}<extra></extra>'
-    ))
-    
-    fig.add_annotation(
-        x=2020,
-        y=world_data[world_data['Year'] == 2020]['Electric cars sold'].values[0],
-        text="Aceleração<br>pós-pandemia",
-        showarrow=True,
-        arrowhead=2,
-        bgcolor="#1e293b",
-        bordercolor="#334155",
-        borderwidth=1,
-        font=dict(color='#cbd5e1')
-    )
+    with tracer.span("chart:global_trend"):
+        fig, extras = get_figure_cache().get_or_build(
+            figure_key(data, 'global_trend'), lambda: build_global_trend_figure(data)
+        )
+        st.markdown(f"**Crescimento Total:** {extras['first_year_sales']:,} (2010) → {extras['last_year_sales']:,} (2023) = **+{extras['total_growth']:,.0f}%**")
     
-    fig.update_layout(
-        title=dict(
-            text="Crescimento Exponencial: Mercado expandiu 100x desde 2010",
-            font=dict(size=14, color='#cbd5e1')
-        ),
-        xaxis_title="Ano",
-        yaxis_title="Vendas Globais (unidades)",
-        height=500,
-        template="plotly_dark",
-        hovermode='x unified',
-        plot_bgcolor='#0f172a',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=20, r=20, t=60, b=20),
-        font=dict(color='#cbd5e1')
-    )
-    st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("<br>", unsafe_allow_html=True)
     col1, col2 = st.columns(2)
@@ -405,28 +389,28 @@ with tab2:
         st.subheader("Crescimento Ano a Ano")
         st.caption("Variação percentual comparando cada ano ao anterior")
         
-        world_copy = world_data.copy()
-        world_copy['Crescimento %'] = world_copy['Electric cars sold'].pct_change() * 100
-        world_copy['Vendas Adicionais'] = world_copy['Electric cars sold'].diff()
+        world_copy = growth_table(data, 'World')
         
-        display_df = world_copy[['Year', 'Electric cars sold', 'Vendas Adicionais', 'Crescimento %']].rename(
-            columns={
-                'Year': 'Ano',
-                'Electric cars sold': 'Vendas Totais',
-                'Vendas Adicionais': 'Novas vs Anterior',
-                'Crescimento %': 'Crescimento %'
-            }
-        )
+        with tracer.span("table:global_yoy"):
+            display_df = world_copy[['Year', 'Electric cars sold', 'Variação Absoluta', 'Crescimento %']].rename(
+                columns={
+                    'Year': 'Ano',
+                    'Electric cars sold': 'Vendas Totais',
+                    'Variação Absoluta': 'Novas vs Anterior',
+                    'Crescimento %': 'Crescimento %'
+                }
+            )
         
-        st.dataframe(
-            display_df.style.format({
-                'Vendas Totais': '{:,.0f}',
-                'Novas vs Anterior': '{:+,.0f}',
-                'Crescimento %': '{:+.1f}%'
-            }),
-            use_container_width=True,
-            height=400
-        )
+            show_table(
+                display_df,
+                {
+                    'Vendas Totais': '{:,.0f}',
+                    'Novas vs Anterior': '{:+,.0f}',
+                    'Crescimento %': '{:+.1f}%'
+                },
+                use_container_width=True,
+                height=400
+            )
         
         max_growth_year = world_copy.loc[world_copy['Crescimento %'].idxmax(), 'Year']
         max_growth_value = world_copy['Crescimento %'].max()
@@ -436,38 +420,59 @@ with tab2:
         st.subheader("Vendas por Período")
         st.caption("Mostra como o mercado acelerou dramaticamente nos anos recentes")
         
-        p1 = world_data[world_data['Year'] <= 2015]['Electric cars sold'].sum()
-        p2 = world_data[(world_data['Year'] >= 2016) & (world_data['Year'] <= 2020)]['Electric cars sold'].sum()
-        p3 = world_data[world_data['Year'] >= 2021]['Electric cars sold'].sum()
-        
-        periods = ['2010-2015', '2016-2020', '2021-2023']
-        values = [p1, p2, p3]
-        
-        fig = go.Figure(data=[go.Bar(
-            x=periods,
-            y=values,
-            marker=dict(color=['#60a5fa', '#3b82f6', '#2563eb']),
-            text=[f"{val:,}" for val in values],
-            textposition='outside',
-            textfont=dict(size=12, color='#f8fafc', family='Arial')
-        )])
-        
-        fig.update_layout(
-            title="Período recente (2021-23) supera toda a década anterior",
-            yaxis_title="Total de Vendas",
-            height=350,
-            template="plotly_dark",
-            showlegend=False,
-            plot_bgcolor='#0f172a',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=20, r=20, t=60, b=20),
-            font=dict(color='#cbd5e1')
+        starts = st.multiselect(
+            "Início de cada período:",
+            options=list(data.years[1:]),
+            default=[y for y in DEFAULT_PERIOD_STARTS if data.year_min < y <= data.year_max],
+            key="period_starts"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        entities = st.multiselect(
+            "Entidades:", options=list(data.entities), default=["World"], key="period_entities"
+        ) or ["World"]
+        entities = sorted(entities)
+        periods = period_buckets(data.year_min, data.year_max, starts)
+        
+        with tracer.span("chart:periods"):
+            fig, extras = get_figure_cache().get_or_build(
+                figure_key(data, 'periods', entities, params=sorted(starts)),
+                lambda: build_periods_figure(
+                    data, None if sorted(starts) == DEFAULT_PERIOD_STARTS else periods, entities
+                )
+            )
+            st.plotly_chart(fig, use_container_width=True)
         
-        st.success(f"2021-2023 teve {(p3/p2-1)*100:.0f}% mais vendas que 2016-2020")
+        labels, totals = extras['labels'], extras['totals']
+        if len(totals) >= 2 and totals[-2] > 0:
+            prefix = f"{extras['entity']}: " if len(entities) > 1 else ""
+            st.success(f"{prefix}{labels[-1]} teve {(totals[-1]/totals[-2]-1)*100:.0f}% mais vendas que {labels[-2]}")
+    
+    st.markdown("---")
+    st.subheader("Janelas Móveis")
+    st.caption("Total, média ou CAGR de qualquer conjunto de entidades em janelas deslizantes de anos")
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    rolling_entities = sorted(col1.multiselect(
+        "Entidades:", options=list(data.entities), default=["World"], key="rolling_entities"
+    ))
+    window = col2.number_input("Janela (anos):", min_value=1, max_value=len(data.years), value=DEFAULT_ROLLING_WINDOW, key="rolling_window")
+    stat_labels = {'total': 'Total', 'mean': 'Média anual', 'cagr': 'CAGR %'}
+    stat = col3.selectbox("Estatística:", list(stat_labels), format_func=stat_labels.get, key="rolling_stat")
+    
+    if rolling_entities:
+        with tracer.span("chart:rolling"):
+            fig, _ = get_figure_cache().get_or_build(
+                figure_key(data, 'rolling', rolling_entities, params=(window, stat)),
+                lambda: build_rolling_figure(
+                    rolling_windows(data, rolling_entities, window, stat), window, stat
+                )
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+
+LINE_CHART_MAX_SERIES = 15
+
 
-with tab3:
+def render_comparison(data, selected_countries, year_range):
     st.markdown("""
     <div style='background: #1e293b; padding: 1.5rem; border-radius: 8px; margin-bottom: 1.5rem; border: 1px solid #334155;'>
         <h2 style='color: #f8fafc; margin: 0 0 0.5rem 0; font-size: 1.5rem;'>Comparação Entre Países</h2>
@@ -475,115 +480,232 @@ with tab3:
     """, unsafe_allow_html=True)
     
     if selected_countries:
-        comparison_data = []
-        for country in selected_countries:
-            country_df = get_country_data(df, country)
-            country_df = country_df[(country_df['Year'] >= year_range[0]) & (country_df['Year'] <= year_range[1])]
-            comparison_data.append(country_df)
-        
-        df_comp = pd.concat(comparison_data)
-        
-        fig = px.line(
-            df_comp,
-            x='Year',
-            y='Electric cars sold',
-            color='Entity',
-            markers=True,
-            labels={'Electric cars sold': 'Vendas Anuais', 'Year': 'Ano', 'Entity': 'País'},
-            color_discrete_sequence=['#3b82f6', '#60a5fa', '#93c5fd', '#2563eb', '#1d4ed8']
-        )
-        
-        fig.update_layout(
-            title=dict(
-                text=f"Trajetória Comparativa: {', '.join(selected_countries)} ({year_range[0]}-{year_range[1]})",
-                font=dict(size=13, color='#cbd5e1')
-            ),
-            height=500,
-            template="plotly_dark",
-            hovermode='x unified',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1,
-                bgcolor='#1e293b',
-                bordercolor='#334155',
-                borderwidth=1
-            ),
-            plot_bgcolor='#0f172a',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=20, r=20, t=80, b=20),
-            font=dict(color='#cbd5e1')
-        )
-        
-        fig.update_traces(line=dict(width=2.5), marker=dict(size=7))
-        fig.update_xaxes(gridcolor='#1e293b', linecolor='#334155')
-        fig.update_yaxes(gridcolor='#1e293b', linecolor='#334155')
-        st.plotly_chart(fig, use_container_width=True)
+        with tracer.span("comparison"):
+            comparison = compare_entities(data, selected_countries, year_range)
+        
+        # Gráfico de linhas até LINE_CHART_MAX_SERIES séries; acima disso fica ilegível e vira mapa de calor
+        use_heatmap = len(selected_countries) > LINE_CHART_MAX_SERIES
+        chart = 'comparison_heatmap' if use_heatmap else 'comparison_line'
+        build = build_comparison_heatmap_figure if use_heatmap else build_comparison_line_figure
+        with tracer.span(f"chart:{chart}"):
+            fig, _ = get_figure_cache().get_or_build(
+                figure_key(data, chart, selected_countries, year_range),
+                lambda: build(comparison, year_range)
+            )
+            st.plotly_chart(fig, use_container_width=True)
         
         st.markdown("<br>", unsafe_allow_html=True)
         st.subheader("Análise Detalhada por Ano")
         st.caption("Compare vendas entre países e anos")
         
-        pivot = df_comp.pivot(index='Year', columns='Entity', values='Electric cars sold')
-        pivot['Total Anual'] = pivot.sum(axis=1)
+        pivot = comparison.pivot
         
         col1, col2 = st.columns([3, 1])
         with col1:
-            st.dataframe(
-                pivot.style.format("{:,.0f}"),
-                use_container_width=True
-            )
+            with tracer.span("table:comparison_pivot"):
+                render_paged_table(pivot, "comparison_pivot", "{:,.0f}")
         
         with col2:
             st.markdown("**💡 Insights:**")
-            for country in selected_countries:
-                country_data = df_comp[df_comp['Entity'] == country]
-                if len(country_data) > 1:
-                    total = country_data['Electric cars sold'].sum()
-                    growth = (country_data.iloc[-1]['Electric cars sold'] - 
-                             country_data.iloc[0]['Electric cars sold']) / \
-                             country_data.iloc[0]['Electric cars sold'] * 100
-                    st.metric(
-                        country,
-                        f"{total:,}",
-                        delta=f"+{growth:.0f}%",
-                        help=f"Total no período com crescimento percentual"
-                    )
+            if len(selected_countries) <= 5:
+                for country in selected_countries:
+                    growth = comparison.growth[country]
+                    if pd.notna(growth):
+                        st.metric(
+                            country,
+                            f"{comparison.totals[country]:,}",
+                            delta=f"+{growth:.0f}%",
+                            help="Total no período com crescimento percentual"
+                        )
+            else:
+                show_table(
+                    pd.DataFrame({
+                        'Total': comparison.totals,
+                        'Crescimento %': comparison.growth,
+                        'Participação %': comparison.shares
+                    }),
+                    {'Total': '{:,.0f}', 'Crescimento %': '{:+.0f}%', 'Participação %': '{:.1f}%'},
+                    use_container_width=True
+                )
         
         st.markdown("---")
         st.subheader("Participação de Mercado")
         
-        market_share = df_comp.groupby('Entity')['Electric cars sold'].sum().sort_values(ascending=False)
-        market_share_pct = (market_share / market_share.sum() * 100)
-        
-        fig_pie = go.Figure(data=[go.Pie(
-            labels=market_share_pct.index,
-            values=market_share_pct.values,
-            hole=0.4,
-            textinfo='label+percent',
-            hovertemplate='<b>%{label}</b><br>%{percent}<br>Vendas: %{value:,.0f}<extra></extra>',
-            marker=dict(colors=['#3b82f6', '#60a5fa', '#93c5fd', '#2563eb', '#1d4ed8'])
-        )])
-        
-        fig_pie.update_layout(
-            height=700,
-            template="plotly_dark",
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='#cbd5e1')
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        with tracer.span("chart:market_share"):
+            fig_pie, extras = get_figure_cache().get_or_build(
+                figure_key(data, 'market_share', selected_countries, year_range),
+                lambda: build_market_share_figure(comparison)
+            )
+            st.plotly_chart(fig_pie, use_container_width=True)
 
-        leader = market_share.index[0]
-        leader_pct = market_share_pct.iloc[0]
+        leader = extras['leader']
+        leader_pct = extras['leader_pct']
         st.info(f"{leader} tem a maior partipação com {leader_pct:.1f}% das vendas entre o mercado de veículos elétricos, graças a políticas agressivas e incentivos para o uso desses veículos.")
         
+        metrics = get_metrics(data)
+        if metrics:
+            st.markdown("---")
+            st.subheader("Outros Indicadores")
+            name = st.selectbox("Indicador:", list(metrics), format_func=metrics.get, key="comparison_metric")
+            with tracer.span("table:comparison_metric"):
+                table = metric_table(data, name, selected_countries, year_range)
+                render_paged_table(table, "comparison_metric", "{:,.2f}" if name == 'sales_share' else "{:,.0f}")
+        
         
     else:
         st.info("👈 Selecione países na barra lateral para iniciar a comparação")
 
-with tab4:
+
+PROJECTION_FORMATS = {
+    'Vendas (último ano)': '{:,.0f}',
+    'CAGR %': '{:+.1f}%',
+    'YoY %': '{:+.1f}%',
+    'Aceleração (p.p.)': '{:+.1f}',
+    'Tendência Log-Linear %': '{:+.1f}%',
+    'R² Log-Linear': '{:.3f}',
+    'Teto Logístico': '{:,.0f}',
+    'R² Logístico': '{:.3f}'
+}
+
+
+def render_projections(data, selected_countries):
+    st.markdown("""
+    <div style='background: #1e293b; padding: 1.5rem; border-radius: 8px; margin-bottom: 1.5rem; border: 1px solid #334155;'>
+        <h2 style='color: #f8fafc; margin: 0 0 0.5rem 0; font-size: 1.5rem;'>Projeções de Crescimento</h2>
+        <p style='color: #94a3b8; margin: 0; font-size: 0.95rem;'>
+            Tendência ajustada e projeção das vendas por modelo log-linear ou logístico
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    default = [c for c in selected_countries[:5] if c in data.entity_index] or ["World"]
+    entities = sorted(col1.multiselect(
+        "Entidades:", options=list(data.entities), default=default, key="projection_entities"
+    ))
+    horizon = col2.number_input("Horizonte (anos):", min_value=1, max_value=15, value=DEFAULT_HORIZON, key="projection_horizon")
+    model = col3.selectbox("Modelo:", list(MODELS), format_func=MODELS.get, key="projection_model")
+
+    if entities:
+        with tracer.span("chart:projection"):
+            fig, _ = get_figure_cache().get_or_build(
+                figure_key(data, 'projection', entities, params=(horizon, model)),
+                lambda: build_projection_figure(
+                    projection_frame(data, entities, horizon, model), MODELS[model], horizon
+                )
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        st.caption(
+            "Projeções estatísticas simples a partir do histórico; não consideram políticas, "
+            "preços ou oferta. O modelo logístico limita o crescimento a um teto ajustado."
+        )
+
+    st.markdown("---")
+    st.subheader("Métricas de Crescimento")
+    st.caption("CAGR entre o primeiro e o último ano, variação do último ano (YoY), sua aceleração e a qualidade dos ajustes")
+    countries_only = st.checkbox("Apenas países", key="projection_countries_only")
+    with tracer.span("table:growth_metrics"):
+        metrics = growth_metrics(data, countries_only).drop(columns='Agregado')
+        render_paged_table(metrics, "growth_metrics", PROJECTION_FORMATS)
+
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def page_controls(n_rows, key):
+    """Página (base 0) e tamanho escolhidos; sem controles quando tudo cabe em uma página"""
+    if n_rows <= PAGE_SIZES[0]:
+        return 0, PAGE_SIZES[0]
+    col1, col2, col3 = st.columns([1, 1, 2])
+    page_size = col1.selectbox("Linhas por página", PAGE_SIZES, key=f"{key}_page_size")
+    n_pages = -(-n_rows // page_size)
+    # A chave inclui o total de páginas: mudar filtros ou tamanho volta a uma página válida
+    page = col2.number_input("Página", min_value=1, max_value=n_pages, key=f"{key}_page_{n_pages}")
+    col3.caption(f"{n_rows:,} linhas · página {page} de {n_pages}")
+    return page - 1, page_size
+
+
+_NUMBER_FORMAT = re.compile(r"\{:(\+?)(,?)(?:\.(\d+))?([df])\}")
+
+
+def printf_format(fmt):
+    """Formato do str.format ('{:+,.1f}%', usado no Styler) no printf do navegador ('%+,.1f%%')"""
+    match = _NUMBER_FORMAT.search(fmt)
+    sign, comma, precision, kind = match.groups()
+    spec = f"%{sign}{comma}" + (f".{precision}" if precision else "") + kind
+    return fmt[:match.start()].replace('%', '%%') + spec + fmt[match.end():].replace('%', '%%')
+
+
+def show_table(frame, formats, **kwargs):
+    """
+    st.dataframe com `formats` (um formato para todas as colunas numéricas ou {coluna: formato}).
+    No modo 'arrow' o frame vai sem estilos e a formatação fica no column_config
+    """
+    if TABLE_FORMAT == 'styler':
+        st.dataframe(frame.style.format(formats, na_rep='-'), **kwargs)
+        return
+    if isinstance(formats, str):
+        formats = {c: formats for c in frame.columns if pd.api.types.is_numeric_dtype(frame[c])}
+    column_config = {
+        column: st.column_config.NumberColumn(format=printf_format(fmt))
+        for column, fmt in formats.items() if column in frame.columns
+    }
+    st.dataframe(frame, column_config=column_config, **kwargs)
+
+
+def render_paged_table(frame, key, formats):
+    """Formata e envia ao navegador apenas a página visível de `frame`"""
+    page, page_size = page_controls(len(frame), key)
+    start, end = page_slice(len(frame), page, page_size)
+    show_table(frame.iloc[start:end], formats, use_container_width=True)
+
+
+def render_export_buttons(data, key, name, frame_fn, n_rows):
+    """
+    Um botão por formato; o arquivo só é gerado (ou lido do cache) no clique.
+
+    A escrita em blocos limita a memória na geração, não no envio: o Streamlit não faz
+    streaming de downloads e lê o retorno do callable inteiro (bytes ou arquivo aberto) para
+    o armazenamento de mídia em memória. O custo é um arquivo por exportação distinta: o id
+    é o hash do conteúdo, então sessões que baixam o mesmo arquivo (mesma versão dos dados em
+    data/exports) compartilham uma cópia, liberada quando nenhuma sessão a referencia mais
+    """
+    cols = st.columns(len(EXPORT_FORMATS))
+    for col, (fmt, (label, mime)) in zip(cols, EXPORT_FORMATS.items()):
+        reason = export_unavailable(fmt, n_rows)
+        col.download_button(
+            f"⬇️ {label}",
+            data=lambda fmt=fmt: export_file(data, name, fmt, frame_fn).read_bytes(),
+            file_name=f"{name}.{fmt}",
+            mime=mime,
+            key=f"export_{key}_{fmt}",
+            on_click="ignore",
+            disabled=reason is not None,
+            help=reason,
+            use_container_width=True
+        )
+
+
+@st.fragment
+def render_data_explorer(data, selected_countries, year_range):
+    """
+    Fragmento: trocar a visualização/país reexecuta apenas esta seção. Num rerun só do
+    fragmento o trace da execução completa já foi encerrado: os spans vão para um trace
+    próprio, mostrado (com DEBUG) dentro do fragmento, já que a barra lateral não é redesenhada
+    """
+    fragment_tracer = Tracer() if tracer.finished else None
+    explore_data(data, selected_countries, year_range, fragment_tracer or tracer)
+    if fragment_tracer is not None:
+        fragment_tracer.finish()
+        if METRICS_FILE:
+            REGISTRY.export(METRICS_FILE)
+        if DEBUG:
+            with st.expander("⏱️ Tempos deste rerun do fragmento"):
+                render_timings(fragment_tracer, "Total do fragmento")
+
+
+def explore_data(data, selected_countries, year_range, tracer):
+    """Visualizações da aba Dados; os spans vão para `tracer`"""
     st.markdown("""
     <div style='background: #1e293b; padding: 1.5rem; border-radius: 8px; margin-bottom: 1.5rem; border: 1px solid #334155;'>
         <h2 style='color: #f8fafc; margin: 0 0 0.5rem 0; font-size: 1.5rem;'>Explorador de Dados</h2>
@@ -597,28 +719,27 @@ with tab4:
     
     if view == "📊 Dados Globais":
         st.markdown("**Total de vendas mundiais por ano** - Agregação de todos os países")
-        global_df = get_global_trend(df)
-        global_df['Crescimento Anual %'] = global_df['Electric cars sold'].pct_change() * 100
-        
-        st.dataframe(
-            global_df[['Year', 'Electric cars sold', 'Crescimento Anual %']].rename(columns={
-                'Year': 'Ano',
-                'Electric cars sold': 'Vendas Globais',
-                'Crescimento Anual %': 'Crescimento Anual %'
-            }).style.format({
-                'Vendas Globais': '{:,.0f}',
-                'Crescimento Anual %': '{:+.1f}%'
-            }),
-            use_container_width=True
-        )
+        global_df = growth_table(data, 'World')
+        
+        with tracer.span("table:global_growth"):
+            render_paged_table(
+                global_df[['Year', 'Electric cars sold', 'Crescimento %']].rename(columns={
+                    'Year': 'Ano',
+                    'Electric cars sold': 'Vendas Globais',
+                    'Crescimento %': 'Crescimento Anual %'
+                }),
+                "global_growth",
+                {
+                    'Vendas Globais': '{:,.0f}',
+                    'Crescimento Anual %': '{:+.1f}%'
+                }
+            )
     
     elif view == "🌍 Dados por País":
         st.markdown("**Selecione um país para ver sua evolução detalhada**")
-        country = st.selectbox("Escolha o país:", get_countries_list(df))
+        country = st.selectbox("Escolha o país:", get_countries_list(data))
         
-        country_data = get_country_data(df, country)
-        country_data['Crescimento %'] = country_data['Electric cars sold'].pct_change() * 100
-        country_data['Variação Absoluta'] = country_data['Electric cars sold'].diff()
+        country_data = growth_table(data, country)
         
         total_country = country_data['Electric cars sold'].sum()
         avg_sales = country_data['Electric cars sold'].mean()
@@ -628,35 +749,127 @@ with tab4:
         col2.metric("Média Anual", f"{avg_sales:,.0f}")
         col3.metric("Anos com Dados", len(country_data))
         
-        st.dataframe(
-            country_data[['Year', 'Electric cars sold', 'Variação Absoluta', 'Crescimento %']].rename(columns={
-                'Year': 'Ano',
-                'Electric cars sold': 'Vendas',
-                'Variação Absoluta': 'Mudança vs Ano Anterior',
-                'Crescimento %': 'Crescimento %'
-            }).style.format({
-                'Vendas': '{:,.0f}',
-                'Mudança vs Ano Anterior': '{:+,.0f}',
-                'Crescimento %': '{:+.1f}%'
-            }),
-            use_container_width=True
-        )
+        with tracer.span("table:country_growth"):
+            render_paged_table(
+                country_data[['Year', 'Electric cars sold', 'Variação Absoluta', 'Crescimento %']].rename(columns={
+                    'Year': 'Ano',
+                    'Electric cars sold': 'Vendas',
+                    'Variação Absoluta': 'Mudança vs Ano Anterior',
+                    'Crescimento %': 'Crescimento %'
+                }),
+                "country_growth",
+                {
+                    'Vendas': '{:,.0f}',
+                    'Mudança vs Ano Anterior': '{:+,.0f}',
+                    'Crescimento %': '{:+.1f}%'
+                }
+            )
     
     elif view == "📥 Download Completo":
         st.markdown("**Dataset completo com todos os países e anos (Fonte: API OWID)**")
         
+        info = dataset_info(data)
         st.info(f"""
         📊 **Informações do Dataset:**
-        - Total de registros: {len(df):,}
-        - Países: {df['Entity'].nunique()}
-        - Período: {df['Year'].min():.0f} - {df['Year'].max():.0f}
-        - Total de vendas registradas: {df['Electric cars sold'].sum():,.0f}
+        - Total de registros: {info['rows']:,}
+        - Países: {info['entities']}
+        - Período: {info['year_min']:.0f} - {info['year_max']:.0f}
+        - Total de vendas registradas: {info['total_sales']:,.0f}
         - Fonte: Our World in Data API
         """)
         
-        st.dataframe(
-            df.head(20).style.format({'Electric cars sold': '{:,.0f}'}),
-            use_container_width=True
+        st.markdown("**Explore o dataset completo:**")
+        col1, col2, col3 = st.columns(3)
+        text = col1.text_input("Entidade contém:", key="explorer_text")
+        years = col2.slider(
+            "Anos:", data.year_min, data.year_max, (data.year_min, data.year_max), key="explorer_years"
         )
+        max_sales = get_summary_stats(data)['max_sales']
+        sales = col3.slider("Vendas:", 0, max_sales, (0, max_sales), key="explorer_sales")
+        
+        sort_labels = {'Entity': 'Entidade', 'Year': 'Ano', 'Electric cars sold': 'Vendas'}
+        col4, col5 = st.columns(2)
+        sort_by = col4.selectbox("Ordenar por:", list(sort_labels), format_func=sort_labels.get, key="explorer_sort")
+        ascending = col5.radio("Ordem:", ["Crescente", "Decrescente"], horizontal=True, key="explorer_order") == "Crescente"
+        
+        with tracer.span("query:explorer"):
+            rows = filter_rows(data, text, years, sales, sort_by, ascending)
+            n_rows = len(rows)
+        page, page_size = page_controls(n_rows, "explorer")
+        start, end = page_slice(n_rows, page, page_size)
+        
+        with tracer.span("table:explorer"):
+            show_table(
+                page_rows(data, rows, start, end),
+                {'Electric cars sold': '{:,.0f}'},
+                use_container_width=True
+            )
         
-        st.markdown("*Mostrando primeiras 20 linhas do dataset completo.*")
+        if n_rows <= page_size:
+            st.markdown(f"*{n_rows:,} de {info['rows']:,} linhas do dataset.*")
+        
+        st.markdown("**Baixar dataset completo:**")
+        render_export_buttons(data, 'full', 'ev_sales_global', lambda: data.df, info['rows'])
+        
+        st.markdown("**Baixar comparação atual** (países e período selecionados na barra lateral):")
+        if selected_countries:
+            render_export_buttons(
+                data,
+                'comparison',
+                export_name('comparacao', selected_countries, year_range),
+                lambda: compare_entities(data, selected_countries, year_range).long,
+                len(selected_countries) * (year_range[1] - year_range[0] + 1)
+            )
+        else:
+            st.caption("Nenhum país selecionado.")
+
+
+# Abas com execução sob demanda: trocar de aba dispara um rerun e só a aba aberta
+# calcula seus dados e monta seus gráficos/tabelas
+def render_tabs(data, selected_countries, year_range):
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        ["Visão Geral", "Tendências", "Comparação", "Projeções", "Dados"],
+        key="active_tab",
+        on_change="rerun"
+    )
+
+    if tab1.open:
+        with tab1, tracer.span("tab:overview"):
+            render_overview(data)
+    if tab2.open:
+        with tab2, tracer.span("tab:trends"):
+            render_trends(data)
+    if tab3.open:
+        with tab3, tracer.span("tab:comparison"):
+            render_comparison(data, selected_countries, year_range)
+    if tab4.open:
+        with tab4, tracer.span("tab:projections"):
+            render_projections(data, selected_countries)
+    if tab5.open:
+        with tab5, tracer.span("tab:data"):
+            render_data_explorer(data, selected_countries, year_range)
+
+
+# ========================
+# EXECUÇÃO E INSTRUMENTAÇÃO
+# ========================
+
+# Perfil opcional desta execução: parado no `finally` mesmo quando a execução termina
+# antes (st.stop, rerun, exceção numa aba); só uma sessão captura por vez
+profile_capture = None
+if st.session_state.pop('profile_next', False):
+    profile_capture = ProfileCapture().start()
+    if profile_capture is None:
+        st.sidebar.warning("Outra sessão está perfilando; tente novamente em instantes.")
+try:
+    render_tabs(*render_sidebar())
+
+    if METRICS_FILE:
+        REGISTRY.export(METRICS_FILE)
+finally:
+    tracer.finish()
+    if profile_capture is not None:
+        st.session_state['profile_report'] = profile_capture.stop(DATA_DIR / "profiles")
+
+if DEBUG:
+    render_debug_panel(tracer)
@@ -0,0 +1,7 @@
+"""
+Núcleo de dados e análises do Dashboard de Vendas de Veículos Elétricos.
+
+Importável sem Streamlit; o Plotly só é carregado ao montar figuras.
+Módulos: data (coleta/cache), store (matriz Entity×Year), analytics (consultas),
+figures (gráficos) e cli (execução em lote: ``python -m ev_dashboard``).
+"""
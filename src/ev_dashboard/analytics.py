@@ -0,0 +1,241 @@
+"""
+Consultas e agregações do dashboard sobre o EntityYearStore (sem Streamlit)
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Resultado da comparação entre entidades num período (todas as tabelas de uma só vez)
+Comparison = namedtuple('Comparison', ['long', 'pivot', 'totals', 'growth', 'shares'])
+
+
+def get_global_trend(data):
+    return data.entity_frame('World')
+
+
+def get_top_countries(data, year=None, top_n=10):
+    return data.top_countries(year, top_n)
+
+
+def get_country_data(data, country):
+    return data.entity_frame(country)
+
+
+def get_countries_list(data, region=None):
+    return list(data.region_countries(region))
+
+
+def get_regions(data):
+    return list(data.region_masks)
+
+
+def get_year_range(data):
+    return data.year_min, data.year_max
+
+
+def get_summary_stats(data):
+    return dict(data.summary)
+
+
+def growth_table(data, entity):
+    """Série anual de uma entidade com variação absoluta e crescimento % ano a ano (pré-calculados)"""
+    return data.growth_frame(entity)
+
+
+def period_totals(data, periods, entity='World'):
+    """Soma de vendas por período; `periods` é uma lista de (ano_inicial, ano_final)"""
+    row = data.entity_index.get(entity)
+    if row is None or not periods:
+        return [0] * len(periods)
+    starts, ends = np.array(periods).T
+    totals, _ = data.window_sums(row, starts, ends)
+    return [int(total) for total in totals]
+
+
+# Início dos períodos padrão da aba Tendências (2010-2015, 2016-2020, 2021-2023)
+DEFAULT_PERIOD_STARTS = [2016, 2021]
+
+# Estado inicial da barra lateral e da janela móvel (app e snapshot estático)
+DEFAULT_COUNTRIES = ["China", "United States", "Germany"]
+DEFAULT_YEAR_START = 2015
+DEFAULT_ROLLING_WINDOW = 3
+
+
+def period_buckets(year_min, year_max, starts=DEFAULT_PERIOD_STARTS):
+    """
+    Períodos contíguos cobrindo [year_min, year_max], cada um começando num ano de `starts`
+    (ex.: 2010-2023 com [2016, 2021] -> [(2010, 2015), (2016, 2020), (2021, 2023)])
+    """
+    bounds = sorted({int(year) for year in starts if year_min < year <= year_max})
+    edges = [year_min, *bounds, year_max + 1]
+    return [(start, end - 1) for start, end in zip(edges[:-1], edges[1:])]
+
+
+def _cagr(first, last, years):
+    """CAGR % entre dois valores a `years` anos de distância; NaN sem base positiva"""
+    years = np.asarray(years, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = (np.power(last / first, 1.0 / years) - 1) * 100
+    return np.where((first > 0) & (last > 0) & (years > 0), cagr, np.nan)
+
+
+def window_stats(data, entities, periods):
+    """
+    Total, média anual (anos com registro) e CAGR % de cada entidade em cada período,
+    a partir das somas prefixadas: O(1) por par entidade × período
+    """
+    names = [e for e in entities if e in data.entity_index]
+    if not names or not periods:
+        return pd.DataFrame(columns=['Entity', 'Período', 'Total', 'Média', 'CAGR %'])
+    rows = np.array([data.entity_index[e] for e in names])[:, None]
+    starts, ends = (np.clip(a, data.year_min, data.year_max) for a in np.array(periods).T)
+    totals, counts = data.window_sums(rows, starts, ends)
+
+    # CAGR entre as pontas do período (NaN se alguma ponta não tem registro)
+    values, present = data.block(rows[:, 0])
+    values = np.where(present, values, 0).astype(np.float64)
+    first = values[:, starts - data.year_min]
+    last = values[:, ends - data.year_min]
+
+    with np.errstate(invalid='ignore'):
+        mean = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+    labels = [f"{start}-{end}" for start, end in periods]
+    return pd.DataFrame({
+        'Entity': np.repeat(names, len(periods)),
+        'Período': labels * len(names),
+        'Total': totals.ravel(),
+        'Média': mean.ravel(),
+        'CAGR %': _cagr(first, last, ends - starts).ravel()
+    })
+
+
+def rolling_windows(data, entities, window, stat='total'):
+    """
+    Janela móvel de `window` anos terminando em cada ano (Ano × Entidade).
+    `stat`: 'total', 'mean' (média dos anos com registro) ou 'cagr' (CAGR % entre as pontas).
+    """
+    names = [e for e in entities if e in data.entity_index]
+    window = min(max(int(window), 1), len(data.years))
+    ends = data.years[window - 1:]
+    rows = np.array([data.entity_index[e] for e in names], dtype=np.int64)[:, None]
+    totals, counts = data.window_sums(rows, ends - window + 1, ends)
+    if stat == 'total':
+        values = totals.astype(np.float64)
+        values[counts == 0] = np.nan
+    elif stat == 'mean':
+        with np.errstate(invalid='ignore'):
+            values = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+    elif stat == 'cagr':
+        values, present = data.block(rows[:, 0])
+        matrix = np.where(present, values, 0).astype(np.float64)
+        values = _cagr(matrix[:, :len(ends)], matrix[:, window - 1:], window - 1)
+    else:
+        raise ValueError(f"Estatística de janela desconhecida: {stat}")
+    return pd.DataFrame(values.T, index=pd.Index(ends, name='Year'), columns=names)
+
+
+def compare_entities(data, entities, year_range):
+    """
+    Comparação vetorizada de qualquer conjunto de entidades num período, em uma passada
+    sobre o bloco (entidades × anos) da matriz, sem laços por país:
+
+    - long: Entity, Code, Year, vendas (anos com registro)
+    - pivot: Ano × Entidade com a coluna 'Total Anual'
+    - totals: vendas no período por entidade (decrescente)
+    - growth: crescimento % do primeiro ao último ano com registro (NaN com menos de 2 anos)
+    - shares: participação % de cada entidade no total das selecionadas
+    """
+    names = sorted(e for e in set(entities) if e in data.entity_index)
+    rows = np.array([data.entity_index[e] for e in names], dtype=np.intp)
+    first_col = max(int(year_range[0]) - data.year_min, 0)
+    last_col = min(int(year_range[1]) - data.year_min, len(data.years) - 1)
+    cols = slice(first_col, last_col + 1)
+
+    values, mask = data.block(rows, cols)
+    years = data.years[cols]
+    names_arr = np.array(names, dtype=object)
+
+    entity_idx, year_idx = np.nonzero(mask)
+    long = pd.DataFrame({
+        'Entity': names_arr[entity_idx],
+        'Code': data.codes[rows][entity_idx],
+        'Year': years[year_idx],
+        'Electric cars sold': values[entity_idx, year_idx]
+    })
+
+    pivot = pd.DataFrame(
+        np.where(mask, values, np.nan).T,
+        index=pd.Index(years, name='Year'),
+        columns=pd.Index(names, name='Entity')
+    )
+    pivot = pivot[mask.any(axis=0)]
+    pivot['Total Anual'] = pivot.sum(axis=1)
+
+    totals = values.sum(axis=1)
+    n_years = mask.shape[1]
+    counts = mask.sum(axis=1)
+    first = values[np.arange(len(rows)), mask.argmax(axis=1)] if n_years else np.zeros(len(rows))
+    last = values[np.arange(len(rows)), n_years - 1 - mask[:, ::-1].argmax(axis=1)] if n_years else first
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where((counts > 1) & (first > 0), (last - first) / first * 100, np.nan)
+        shares = totals / totals.sum() * 100 if totals.sum() else np.zeros(len(rows))
+
+    order = np.argsort(-totals, kind='stable')
+    index = pd.Index(names_arr[order], name='Entity')
+    return Comparison(
+        long=long,
+        pivot=pivot,
+        totals=pd.Series(totals[order], index=index, name='Electric cars sold'),
+        growth=pd.Series(growth[order], index=index, name='Crescimento %'),
+        shares=pd.Series(shares[order], index=index, name='Participação %')
+    )
+
+
+def filter_rows(data, text=None, year_range=None, sales_range=None, sort_by='Entity', ascending=True):
+    """Seleção das linhas que passam nos filtros, na ordem pedida (use `len` e fatias + `page_rows`)"""
+    return data.filter_rows(text, year_range, sales_range, sort_by, ascending)
+
+
+def page_rows(data, selection, start, end):
+    """DataFrame das linhas [start, end) de uma seleção de `filter_rows`"""
+    return data.take(selection[start:end])
+
+
+def get_metrics(data):
+    """Indicadores extras do registro de datasets carregados no store: {nome: rótulo}"""
+    return {name: metric.label for name, metric in data.metrics.items()}
+
+
+def metric_table(data, name, entities, year_range):
+    """Ano × Entidade de um indicador extra no período (NaN nos anos sem registro)"""
+    metric = data.metrics[name]
+    names = sorted(e for e in set(entities) if e in data.entity_index)
+    rows = np.array([data.entity_index[e] for e in names], dtype=np.intp)
+    first_col = max(int(year_range[0]) - data.year_min, 0)
+    last_col = min(int(year_range[1]) - data.year_min, len(data.years) - 1)
+    cols = slice(first_col, last_col + 1)
+
+    present = metric.present[rows][:, cols]
+    table = pd.DataFrame(
+        np.where(present, metric.values[rows][:, cols], np.nan).T,
+        index=pd.Index(data.years[cols], name='Year'),
+        columns=pd.Index(names, name='Entity')
+    )
+    return table[present.any(axis=0)]
+
+
+def page_slice(n_rows, page, page_size):
+    """Intervalo [início, fim) da página `page` (base 0), limitado ao total de linhas"""
+    start = min(page * page_size, n_rows)
+    return start, min(start + page_size, n_rows)
+
+
+def dataset_info(data):
+    return {
+        'rows': data.summary['rows'],
+        'entities': data.summary['entities'],
+        'year_min': data.year_min,
+        'year_max': data.year_max,
+        'total_sales': data.summary['total_sales']
+    }
@@ -0,0 +1,211 @@
+"""
+Benchmarks das consultas do dashboard sobre datasets sintéticos no formato de
+ev_sales_global.csv, em escalas de 1x a 1.000.000x o número de linhas.
+
+Nas escalas maiores o dataset ganha entidades extras e granularidade mensal/diária;
+os períodos são codificados como inteiros consecutivos na coluna Year (a matriz
+Entity×Year é indexada por período). Cada cenário roda em um processo novo, para que
+o pico de memória (RSS) seja o do cenário. O resultado é gravado em JSON.
+
+    python -m ev_dashboard bench --scales 1,100 --output bench.json
+    python -m ev_dashboard bench --compare bench_anterior.json
+"""
+import math
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_ROWS = 418  # linhas do ev_sales_global.csv original
+BASE_YEARS = 14  # 2010-2023
+DEFAULT_SCALES = [1, 100, 10_000]  # 1.000.000x (~418M linhas) só sob demanda
+
+
+def _granularity(scale):
+    """Passos de tempo por ano: anual até 100x, mensal até 10.000x, diária acima"""
+    if scale < 100:
+        return 1
+    if scale < 10_000:
+        return 12
+    return 365
+
+
+def make_synthetic_dataset(scale, seed=0):
+    """DataFrame no formato do CSV do OWID com ~BASE_ROWS * scale linhas"""
+    rng = np.random.default_rng(seed)
+    steps = BASE_YEARS * _granularity(scale)
+    n_countries = max(1, math.ceil(BASE_ROWS * scale / steps))
+
+    # Curvas de adoção exponenciais com ruído, e ~5% de lacunas como nos dados reais
+    growth = rng.uniform(1.2, 1.8, size=(n_countries, 1)) ** (1 / _granularity(scale))
+    base = rng.uniform(10, 5_000, size=(n_countries, 1))
+    noise = rng.uniform(0.9, 1.1, size=(n_countries, steps))
+    sales = (base * growth ** np.arange(steps) * noise).astype(np.int64)
+    present = rng.random((n_countries, steps)) > 0.05
+
+    names = np.array([f"Country {i:06d}" for i in range(n_countries)], dtype=object)
+    codes = np.array([f"C{i:06d}" for i in range(n_countries)], dtype=object)
+    rows, cols = np.nonzero(present)
+    countries = pd.DataFrame({
+        'Entity': names[rows],
+        'Code': codes[rows],
+        'Year': 2010 + cols,
+        'Electric cars sold': sales[rows, cols]
+    })
+
+    world = pd.DataFrame({
+        'Entity': 'World',
+        'Code': 'OWID_WRL',
+        'Year': 2010 + np.arange(steps),
+        'Electric cars sold': np.where(present, sales, 0).sum(axis=0)
+    })
+    return pd.concat([countries, world], ignore_index=True)
+
+
+def _timed(fn, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+
+    # Passada extra, fora da medição de tempo, para o pico de alocação (tracemalloc)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'min_s': min(durations),
+        'median_s': statistics.median(durations),
+        'repeat': repeat,
+        'peak_alloc_mb': peak / 2**20
+    }
+
+
+def run_scenario(scale, repeat=5):
+    """Executa todas as medições de uma escala (chamado em processo separado)"""
+    from .analytics import (
+        compare_entities, get_countries_list, get_summary_stats, get_top_countries, growth_table
+    )
+    from .forecast import fit_growth
+    from .store import load_shared_store
+
+    with tempfile.TemporaryDirectory(prefix="ev_bench_") as workdir:
+        csv_path = Path(workdir) / "ev_sales_global.csv"
+        df = make_synthetic_dataset(scale)
+        df.to_csv(csv_path, index=False)
+        rows = len(df)
+        del df
+
+        def load_cold():
+            # Remove caches Arrow/.npy e carimbo de versão: parse + limpeza + matriz
+            for path in Path(workdir).iterdir():
+                if path.is_dir():
+                    shutil.rmtree(path)
+                elif path != csv_path:
+                    path.unlink()
+            load_shared_store(csv_path)
+
+        ops = {'load_cold': _timed(load_cold, max(1, min(repeat, 3)))}
+        ops['load_warm'] = _timed(lambda: load_shared_store(csv_path), repeat)
+
+        data = load_shared_store(csv_path)
+        top5 = get_top_countries(data, top_n=5).index.tolist()
+        mid_year = (data.year_min + data.year_max) // 2
+        window = (mid_year, data.year_max)
+
+        ops['top_countries'] = _timed(lambda: get_top_countries(data), repeat)
+        ops['top_countries_year'] = _timed(lambda: get_top_countries(data, year=mid_year), repeat)
+        ops['summary_stats'] = _timed(lambda: get_summary_stats(data), repeat)
+        ops['comparison_pivot'] = _timed(lambda: compare_entities(data, top5, window), repeat)
+        countries = get_countries_list(data)
+        ops['comparison_all'] = _timed(lambda: compare_entities(data, countries, window), repeat)
+        ops['growth_world'] = _timed(lambda: growth_table(data, 'World'), repeat)
+        ops['growth_country'] = _timed(lambda: growth_table(data, top5[0]), repeat)
+        ops['growth_fit_all'] = _timed(lambda: fit_growth(data), repeat)
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_mb = maxrss / 2**20 if sys.platform == 'darwin' else maxrss / 2**10
+
+        return {
+            'name': f"{scale}x",
+            'scale': scale,
+            'rows': rows,
+            'entities': len(data.entities),
+            'periods': len(data.years),
+            'peak_rss_mb': peak_rss_mb,
+            'ops': ops
+        }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=5):
+    scenarios = []
+    for scale in scales:
+        # Processo novo por cenário: RSS de pico isolado e sem caches do cenário anterior
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            scenarios.append(pool.submit(run_scenario, scale, repeat).result())
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform()
+        },
+        'scenarios': scenarios
+    }
+
+
+def compare(current, baseline, threshold=1.2):
+    """Linhas (cenário, operação, base, atual, razão) com piora acima de `threshold`"""
+    base = {
+        (s['name'], op): r['median_s']
+        for s in baseline['scenarios'] for op, r in s['ops'].items()
+    }
+    regressions = []
+    for scenario in current['scenarios']:
+        for op, result in scenario['ops'].items():
+            before = base.get((scenario['name'], op))
+            if before and result['median_s'] / before > threshold:
+                regressions.append((scenario['name'], op, before, result['median_s'],
+                                    result['median_s'] / before))
+    return regressions
+
+
+def format_report(results):
+    lines = []
+    for scenario in results['scenarios']:
+        lines.append(
+            f"{scenario['name']}: {scenario['rows']:,} linhas, {scenario['entities']:,} entidades, "
+            f"{scenario['periods']:,} períodos, pico RSS {scenario['peak_rss_mb']:,.0f} MB"
+        )
+        for op, r in scenario['ops'].items():
+            lines.append(
+                f"  {op:<20} mediana {r['median_s'] * 1000:10.3f} ms  "
+                f"mín {r['min_s'] * 1000:10.3f} ms  alocação {r['peak_alloc_mb']:8.1f} MB"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,225 @@
+"""
+Execução em lote, sem servidor Streamlit (ex.: cron para aquecer os caches):
+
+    python -m ev_dashboard refresh              # revalida o CSV e aquece o cache compartilhado
+    python -m ev_dashboard precompute           # grava todos os agregados do dashboard em disco
+    python -m ev_dashboard snapshot             # HTML estático do dashboard com os filtros padrão
+    python -m ev_dashboard bench                # benchmarks com datasets sintéticos (JSON)
+    python -m ev_dashboard loadtest             # sessões simultâneas contra um servidor local
+    python -m ev_dashboard startup              # tempo de import e até a primeira renderização
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .analytics import (
+    dataset_info, get_countries_list, get_summary_stats, get_top_countries, growth_table, period_buckets,
+    period_totals
+)
+from .data import CSV_PATH, DATA_DIR
+from .forecast import growth_metrics
+from .registry import PRIMARY_DATASET, active_datasets, attach_metrics, fetch_datasets
+from .snapshot import SNAPSHOT_DIR, render_snapshot
+from .startup import IMPORT_BUDGET_MS
+from .store import BACKEND, load_store
+
+AGGREGATES_DIR = DATA_DIR / "aggregates"
+
+
+def precompute(data, output_dir=AGGREGATES_DIR, figures=True, force=False):
+    """
+    Grava os agregados do dashboard em `output_dir/<versão>/` e retorna o diretório.
+    Versão já gravada é reaproveitada, a menos que `force` seja True.
+    """
+    output_dir = Path(output_dir)
+    target = output_dir / (data.version or 'local')[:16]
+    if target.exists() and not force:
+        return target
+
+    tmp = output_dir / f".{target.name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    summary = {**get_summary_stats(data), 'dataset': dataset_info(data)}
+    (tmp / "summary.json").write_text(json.dumps(summary, indent=2))
+
+    get_top_countries(data, top_n=len(data.countries)).to_csv(tmp / "top_countries.csv")
+    by_year = [
+        get_top_countries(data, year=year).reset_index().assign(Year=year)
+        for year in range(data.year_min, data.year_max + 1)
+    ]
+    pd.concat(by_year).to_csv(tmp / "top_countries_by_year.csv", index=False)
+
+    growth = [growth_table(data, entity) for entity in ['World', *get_countries_list(data)]]
+    pd.concat(growth).to_csv(tmp / "growth.csv", index=False)
+    growth_metrics(data).to_csv(tmp / "growth_metrics.csv", index=False)
+
+    periods = period_buckets(data.year_min, data.year_max)
+    pd.DataFrame({
+        'Período': [f"{start}-{end}" for start, end in periods],
+        'Electric cars sold': period_totals(data, periods)
+    }).to_csv(tmp / "periods.csv", index=False)
+
+    if figures:
+        from .figures import build_global_trend_figure, build_periods_figure, build_top10_figure
+
+        (tmp / "figures").mkdir()
+        for name, build in [('top10', build_top10_figure),
+                            ('global_trend', build_global_trend_figure),
+                            ('periods', build_periods_figure)]:
+            fig, extras = build(data)
+            (tmp / "figures" / f"{name}.json").write_text(fig.to_json())
+            (tmp / "figures" / f"{name}.extras.json").write_text(json.dumps(extras))
+
+    (tmp / "manifest.json").write_text(json.dumps({
+        'version': data.version,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'files': sorted(str(p.relative_to(tmp)) for p in tmp.rglob('*') if p.is_file())
+    }, indent=2))
+
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp, target)
+    return target
+
+
+def _bench(args):
+    from .bench import compare, format_report, run_benchmarks
+
+    results = run_benchmarks([int(s) for s in args.scales.split(",")], repeat=args.repeat)
+    print(format_report(results))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"Resultados em {args.output}")
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        for name, op, before, after, ratio in regressions:
+            print(f"REGRESSÃO {name} {op}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+def _loadtest(args):
+    from .loadtest import compare, format_report, run_loadtest
+
+    # O servidor herda o ambiente: mesmo backend da linha de comando
+    os.environ['EV_DASHBOARD_BACKEND'] = args.backend
+    results = run_loadtest(
+        [int(s) for s in args.sessions.split(",")], rounds=args.rounds, think=args.think, url=args.url,
+        pid=args.pid
+    )
+    print(format_report(results))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"Resultados em {args.output}")
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        for sessions, before, after, ratio in regressions:
+            print(f"REGRESSÃO {sessions} sessões: p95 {before:.0f} ms -> {after:.0f} ms ({ratio:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+def _startup(args):
+    from .startup import format_report, profile_imports, time_to_first_render
+
+    total, direct, packages = profile_imports()
+    timings = None if args.imports_only else time_to_first_render()
+    print(format_report(total, direct, packages, timings, budget=args.budget, top=args.top))
+    return 1 if total > args.budget else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ev_dashboard", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="CSV local do dataset")
+    parser.add_argument("--backend", choices=("memory", "sqlite", "duckdb"), default=BACKEND,
+                        help="backend de consulta (padrão: EV_DASHBOARD_BACKEND ou memory)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh = commands.add_parser("refresh", help="revalida o CSV na API e aquece o cache compartilhado")
+    refresh.add_argument("--force", action="store_true", help="revalida mesmo com o CSV recente")
+
+    pre = commands.add_parser("precompute", help="grava todos os agregados do dashboard em disco")
+    pre.add_argument("-o", "--output", type=Path, default=AGGREGATES_DIR, help="diretório de saída")
+    pre.add_argument("--refresh", action="store_true", help="revalida o CSV antes de calcular")
+    pre.add_argument("--no-figures", action="store_true", help="não gera o JSON das figuras")
+    pre.add_argument("--force", action="store_true", help="regrava mesmo se a versão já existir")
+
+    snap = commands.add_parser("snapshot", help="gera o HTML estático do dashboard (filtros padrão)")
+    snap.add_argument("-o", "--output", type=Path, default=SNAPSHOT_DIR, help="diretório de saída")
+    snap.add_argument("--refresh", action="store_true", help="revalida o CSV antes de gerar")
+    snap.add_argument("--force", action="store_true", help="regera mesmo se a versão não mudou")
+
+    bench = commands.add_parser("bench", help="benchmarks das consultas com datasets sintéticos")
+    bench.add_argument("--scales", default="1,100,10000",
+                       help="escalas separadas por vírgula (ex.: 1,100,10000,1000000)")
+    bench.add_argument("--repeat", type=int, default=5, help="repetições por operação")
+    bench.add_argument("-o", "--output", type=Path, help="arquivo JSON de resultados")
+    bench.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparar")
+    bench.add_argument("--threshold", type=float, default=1.2,
+                       help="razão de mediana a partir da qual há regressão")
+
+    load = commands.add_parser("loadtest", help="teste de carga com sessões simultâneas (latência e memória)")
+    load.add_argument("--sessions", default="1,5,10,20", help="níveis de sessões simultâneas (ex.: 1,5,10,20)")
+    load.add_argument("--rounds", type=int, default=2, help="repetições do roteiro por sessão")
+    load.add_argument("--think", type=float, default=0.0,
+                      help="pausa média entre interações em segundos (0 = carga máxima)")
+    load.add_argument("--url", help="servidor já em execução (padrão: um servidor novo por nível)")
+    load.add_argument("--pid", type=int, help="PID do servidor de --url, para medir a memória")
+    load.add_argument("-o", "--output", type=Path, help="arquivo JSON de resultados")
+    load.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparar")
+    load.add_argument("--threshold", type=float, default=1.2, help="razão de p95 a partir da qual há regressão")
+
+    start = commands.add_parser("startup", help="tempo de import por módulo e até a primeira renderização")
+    start.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS,
+                       help=f"orçamento dos imports do app em ms (padrão: {IMPORT_BUDGET_MS})")
+    start.add_argument("--top", type=int, default=10, help="pacotes listados por tempo de import")
+    start.add_argument("--imports-only", action="store_true", help="não sobe o servidor (só os imports)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        return _bench(args)
+    if args.command == "loadtest":
+        return _loadtest(args)
+    if args.command == "startup":
+        return _startup(args)
+
+    if args.command == "refresh" or args.refresh:
+        import requests  # Só quando há atualização (fora dos demais comandos)
+
+        force = args.command == "refresh" and args.force
+        # Todos os datasets do registro em paralelo; o principal segue o --csv
+        datasets = [
+            d._replace(filename=args.csv.name) if d.name == PRIMARY_DATASET else d
+            for d in active_datasets()
+        ]
+        try:
+            results = fetch_datasets(datasets, args.csv.parent, force=force)
+        except (requests.RequestException, ValueError, OSError) as e:
+            print(f"Falha ao atualizar: {e}", file=sys.stderr)
+            if not args.csv.exists():
+                return 1
+            results = {}
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                print(f"{name}: falha ao atualizar ({result})", file=sys.stderr)
+            else:
+                print(f"{name}: {'atualizado' if result else 'sem alterações'}")
+
+    data = attach_metrics(load_store(args.csv, backend=args.backend), active_datasets(), args.csv.parent, args.csv)
+    print(f"Versão dos dados: {data.version[:16]}")
+
+    if args.command == "precompute":
+        target = precompute(data, args.output, figures=not args.no_figures, force=args.force)
+        print(f"Agregados em {target}")
+    elif args.command == "snapshot":
+        path, generated = render_snapshot(data, args.output, force=args.force)
+        print(f"Snapshot {'gerado' if generated else 'já atualizado'} em {path}")
+    return 0
@@ -0,0 +1,254 @@
+"""
+Coleta e preparo do dataset: download condicional da API do OWID,
+escrita atômica do CSV e cache binário (Arrow) do DataFrame limpo
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas o lock entre threads
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Sem pyarrow: sempre lê o CSV
+    pa = None
+
+# URL da API do OWID para dados de carros elétricos (EV_DASHBOARD_API_URL troca a origem)
+API_URL = os.environ.get("EV_DASHBOARD_API_URL") or "https://github.com/owid/owid-datasets/raw/master/datasets/Electric%20car%20sales%20-%20by%20country/Electric%20car%20sales%20-%20by%20country.csv"
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+CSV_PATH = DATA_DIR / "ev_sales_global.csv"
+CACHE_MAX_AGE_DAYS = 7
+
+# Locks entre threads (sessões do mesmo processo), um por arquivo: datasets diferentes
+# baixam em paralelo. O lock de arquivo cobre outros processos
+_download_thread_locks = {}
+_download_locks_guard = threading.Lock()
+
+# umask do processo, lida uma vez (os.umask só lê trocando o valor, o que não é seguro entre threads)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _is_fresh(csv_path, max_age_days):
+    if not csv_path.exists():
+        return False
+    file_age_days = (datetime.now().timestamp() - csv_path.stat().st_mtime) / 86400
+    return file_age_days < max_age_days
+
+
+def _read_meta(meta_path):
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _atomic_write(path, chunks, validate=None):
+    """
+    Escreve em arquivo temporário no mesmo diretório e renomeia (os.replace é atômico).
+    `validate(tmp_path)` pode rejeitar o conteúdo levantando exceção antes da troca.
+    O arquivo final mantém o modo do anterior, ou 0666 menos o umask se for novo (o
+    temporário do mkstemp nasce 0600 e ficaria inacessível a workers de outro usuário).
+    """
+    try:
+        mode = path.stat().st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        if validate is not None:
+            validate(Path(tmp_path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def _download_lock(lock_path):
+    with _download_locks_guard:
+        thread_lock = _download_thread_locks.setdefault(str(lock_path), threading.Lock())
+    with thread_lock:
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def validate_csv(path):
+    """Valida um CSV baixado antes de substituir o atual; levanta ValueError se inválido"""
+    try:
+        df = pd.read_csv(path)
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f"CSV inválido: {e}") from e
+
+    missing = {'Entity', 'Code', 'Year', 'Electric cars sold'} - set(df.columns)
+    if missing:
+        raise ValueError(f"Colunas ausentes no CSV: {sorted(missing)}")
+    if df['Electric cars sold'].dropna().empty or not (df['Entity'] == 'World').any():
+        raise ValueError("CSV sem dados de vendas globais")
+
+
+def refresh_csv(csv_path=CSV_PATH, api_url=API_URL, max_age_days=CACHE_MAX_AGE_DAYS, timeout=30,
+                validate=validate_csv):
+    """
+    Revalida o CSV local contra a API quando tem mais de `max_age_days` dias.
+
+    - Requisição condicional (If-None-Match/If-Modified-Since): upstream inalterado custa um 304
+    - Download gravado em arquivo temporário e renomeado atomicamente
+    - Single-flight: um download por vez entre sessões e processos; quem esperou o lock
+      reaproveita o arquivo que acabou de ser baixado
+
+    - `validate` é aplicado ao arquivo baixado antes da troca (ValueError mantém o CSV atual)
+
+    Retorna True se o arquivo foi substituído. Erros de rede propagam requests.RequestException.
+    """
+    import requests  # Só quando há download de fato (fora do caminho de inicialização)
+
+    csv_path = Path(csv_path)
+    if _is_fresh(csv_path, max_age_days):
+        return False
+
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    meta_path = csv_path.with_suffix('.meta.json')
+
+    with _download_lock(csv_path.with_suffix('.lock')):
+        # Outra sessão/processo pode ter atualizado enquanto esperávamos o lock
+        if _is_fresh(csv_path, max_age_days):
+            return False
+
+        headers = {}
+        if csv_path.exists():
+            meta = _read_meta(meta_path)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with requests.get(api_url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304:
+                # Dados inalterados: apenas renova a validade do cache local
+                os.utime(csv_path)
+                return False
+            response.raise_for_status()
+            _atomic_write(csv_path, response.iter_content(chunk_size=64 * 1024), validate=validate)
+
+            meta = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': datetime.now().isoformat(timespec='seconds')
+            }
+            _atomic_write(meta_path, [json.dumps(meta).encode()])
+
+    return True
+
+
+def _read_only_frame(columns, index=None):
+    """
+    DataFrame sobre arrays somente leitura, sem cópia dos arrays NumPy recebidos:
+    escrever nos valores levanta ValueError, então frames derivados nunca alteram o
+    original (com ou sem o Copy-on-Write do pandas 3). Séries do pandas são copiadas uma vez para um array próprio.
+    """
+    frozen = {}
+    for name, values in columns.items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = np.array(pd.Categorical(values).codes)
+            codes.setflags(write=False)
+            frozen[name] = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        else:
+            array = values if isinstance(values, np.ndarray) else np.array(values)
+            array.setflags(write=False)
+            frozen[name] = array
+    return pd.DataFrame(frozen, index=index, copy=False)
+
+
+def clean_data(df):
+    """Limpeza e tipagem compacta: Entity/Code categóricos, Year int16, vendas int64"""
+    df = df.dropna(subset=['Electric cars sold'])
+    return _read_only_frame({
+        'Entity': df['Entity'].astype('category'),
+        'Code': df['Code'].astype('category'),
+        'Year': df['Year'].astype(np.int16),
+        'Electric cars sold': df['Electric cars sold'].astype(np.int64)
+    }, index=pd.RangeIndex(len(df)))
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_arrow_cache(cache_path, source_hash):
+    """Abre o cache Arrow via memory-map; None se ausente, corrompido ou de outro CSV"""
+    if pa is None or not cache_path.exists():
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(str(cache_path), 'r'))
+        metadata = reader.schema.metadata or {}
+        if metadata.get(b'source_sha256') != source_hash.encode():
+            return None
+        # split_blocks evita consolidar colunas numéricas: ficam como views do mmap
+        return reader.read_all().to_pandas(split_blocks=True)
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def _write_arrow_cache(df, cache_path, source_hash):
+    if pa is None:
+        return
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'source_sha256': source_hash.encode()
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    try:
+        _atomic_write(cache_path, [sink.getvalue()])
+    except OSError:
+        pass  # Sem permissão de escrita: segue apenas com o DataFrame em memória
+
+
+def load_clean_frame(csv_path=CSV_PATH, source_hash=None):
+    """
+    Dataset limpo a partir do cache binário (Arrow IPC) ao lado do CSV.
+    O cache é invalidado pelo hash SHA-256 do CSV; em cache miss, lê e limpa o CSV
+    uma vez e grava o cache para os próximos processos.
+    """
+    csv_path = Path(csv_path)
+    cache_path = csv_path.with_suffix('.arrow')
+    if source_hash is None:
+        source_hash = _file_sha256(csv_path)
+
+    df = _read_arrow_cache(cache_path, source_hash)
+    if df is None:
+        df = clean_data(pd.read_csv(csv_path))
+        _write_arrow_cache(df, cache_path, source_hash)
+    return df
+
@@ -0,0 +1,84 @@
+"""
+Redução de pontos no servidor para séries longas (mensais/diárias) antes de montar as figuras.
+O navegador nunca recebe mais pontos do que a largura do gráfico consegue mostrar, e acima
+de WEBGL_MIN_POINTS os traços usam Scattergl para o tempo de renderização continuar estável.
+"""
+import os
+
+import numpy as np
+
+# Largura útil (px) assumida para os gráficos de linha no layout wide
+CHART_WIDTH_PX = int(os.environ.get('EV_DASHBOARD_CHART_WIDTH', '1200'))
+
+# Pontos por pixel mantidos após a redução (2 = pico e vale por coluna de pixels)
+POINTS_PER_PX = 2
+
+# Acima deste total de pontos por figura os traços passam para WebGL
+WEBGL_MIN_POINTS = int(os.environ.get('EV_DASHBOARD_WEBGL_MIN_POINTS', '1000'))
+
+# 'lttb' (Largest-Triangle-Three-Buckets) ou 'minmax'
+DOWNSAMPLE_METHOD = os.environ.get('EV_DASHBOARD_DOWNSAMPLE', 'lttb')
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: mantém o primeiro, o último e o ponto de maior área por balde"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+
+    # Baldes internos (excluindo primeiro e último pontos), com limites inteiros
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xf[nxt_lo:nxt_hi].mean()
+        avg_y = yf[nxt_lo:nxt_hi].mean()
+        # Área (x2) do triângulo ponto anterior / candidato / média do próximo balde
+        area = np.abs(
+            (xf[prev] - avg_x) * (yf[lo:hi] - yf[prev])
+            - (xf[prev] - xf[lo:hi]) * (avg_y - yf[prev])
+        )
+        prev = lo + int(area.argmax())
+        keep[i + 1] = prev
+    return np.asarray(x)[keep], np.asarray(y)[keep]
+
+
+def minmax(x, y, n_out):
+    """Mínimo e máximo de cada balde, em ordem de x; totalmente vetorizado"""
+    n = len(x)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return x, y
+    x = np.asarray(x)
+    y = np.asarray(y)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    # Ordenado por balde e depois por y: o primeiro de cada balde é o mínimo, o último o máximo
+    order = np.lexsort((y, bucket))
+    keep = np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1], [0, n - 1]]))
+    return x[keep], y[keep]
+
+
+def downsample(x, y, width_px=None, x_range=None, method=None):
+    """Recorta a série em `x_range` (zoom) e reduz ao número de pontos que cabe em `width_px`"""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if x_range is not None:
+        mask = (x >= x_range[0]) & (x <= x_range[1])
+        x, y = x[mask], y[mask]
+    # A densidade é por pixel: com zoom (x_range) o recorte ganha mais detalhe, não menos
+    n_out = max(3, int((width_px or CHART_WIDTH_PX) * POINTS_PER_PX))
+    if len(x) <= n_out:
+        return x, y
+    reducer = minmax if (method or DOWNSAMPLE_METHOD) == 'minmax' else lttb
+    return reducer(x, y, n_out)
+
+
+def use_webgl(n_points):
+    return n_points > WEBGL_MIN_POINTS
@@ -0,0 +1,139 @@
+"""
+Exportação do dataset e da comparação filtrada em CSV, Parquet e Excel.
+Os arquivos são gerados em blocos de linhas direto para o disco, só quando pedidos,
+e ficam em cache em `data/exports/<versão>/` até os dados mudarem.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from .data import DATA_DIR, _atomic_write
+
+try:
+    import pyarrow as pa
+except ImportError:  # Sem pyarrow: exportação Parquet indisponível
+    pa = None
+
+try:
+    import openpyxl
+except ImportError:  # Sem openpyxl: exportação Excel indisponível
+    openpyxl = None
+
+EXPORTS_DIR = DATA_DIR / "exports"
+CHUNK_ROWS = 100_000
+EXCEL_MAX_ROWS = 1_048_575  # limite de linhas de uma planilha, sem o cabeçalho
+
+# formato -> (rótulo, MIME)
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'text/csv'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet'),
+    'xlsx': ('Excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def _chunks(frame, chunk_rows):
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def _csv_chunks(frame, chunk_rows):
+    for i, chunk in enumerate(_chunks(frame, chunk_rows)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode('utf-8')
+    if len(frame) == 0:
+        yield frame.to_csv(index=False).encode('utf-8')
+
+
+def _write_parquet(frame, path, chunk_rows):
+    import pyarrow.parquet as pq  # Só na exportação: fica fora da inicialização do app
+
+    writer = None
+    try:
+        for chunk in _chunks(frame, chunk_rows):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_excel(frame, path, chunk_rows):
+    # write_only grava as linhas em fluxo, sem manter a planilha inteira em memória
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("dados")
+    sheet.append(list(frame.columns))
+    for chunk in _chunks(frame, chunk_rows):
+        for row in zip(*(chunk[col].tolist() for col in chunk.columns)):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def _atomic_build(path, write):
+    """Executa `write(tmp_path)` e publica o resultado com os.replace"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def export_unavailable(fmt, n_rows):
+    """Motivo pelo qual `fmt` não pode ser gerado para `n_rows` linhas, ou None"""
+    if fmt == 'parquet' and pa is None:
+        return "Instale o pyarrow para exportar em Parquet"
+    if fmt == 'xlsx':
+        if openpyxl is None:
+            return "Instale o openpyxl para exportar em Excel"
+        if n_rows > EXCEL_MAX_ROWS:
+            return f"O Excel comporta no máximo {EXCEL_MAX_ROWS:,} linhas; use CSV ou Parquet"
+    return None
+
+
+def export_name(prefix, countries=(), year_range=None):
+    """Nome de arquivo estável para um recorte (países ordenados + período)"""
+    if not countries and year_range is None:
+        return prefix
+    digest = hashlib.sha256("|".join(sorted(countries)).encode('utf-8')).hexdigest()[:8]
+    years = f"_{int(year_range[0])}-{int(year_range[1])}" if year_range is not None else ""
+    return f"{prefix}{years}_{digest}"
+
+
+def export_file(data, name, fmt, frame_fn, output_dir=EXPORTS_DIR, chunk_rows=CHUNK_ROWS):
+    """
+    Caminho do arquivo `name.fmt` da versão atual dos dados, gerando-o se ainda não existir.
+    `frame_fn()` só é chamado quando o arquivo precisa ser montado.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+    version_dir = Path(output_dir) / (data.version or 'local')[:16]
+    path = version_dir / f"{name}.{fmt}"
+    if path.exists():
+        return path
+
+    frame = frame_fn()
+    reason = export_unavailable(fmt, len(frame))
+    if reason is not None:
+        raise RuntimeError(reason)
+
+    if not version_dir.exists():
+        version_dir.mkdir(parents=True, exist_ok=True)
+        # Exportações de versões anteriores não serão mais pedidas
+        for old_dir in version_dir.parent.iterdir():
+            if old_dir != version_dir and old_dir.is_dir():
+                shutil.rmtree(old_dir, ignore_errors=True)
+
+    if fmt == 'csv':
+        _atomic_write(path, _csv_chunks(frame, chunk_rows))
+    elif fmt == 'parquet':
+        _atomic_build(path, lambda tmp: _write_parquet(frame, tmp, chunk_rows))
+    else:
+        _atomic_build(path, lambda tmp: _write_excel(frame, tmp, chunk_rows))
+    return path
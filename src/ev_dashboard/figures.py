@@ -0,0 +1,453 @@
+"""
+Figuras Plotly do dashboard e cache LRU de figuras prontas.
+O Plotly só é importado quando uma figura é montada.
+"""
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import pandas as pd
+
+from .analytics import (
+    DEFAULT_PERIOD_STARTS, get_global_trend, get_top_countries, period_buckets, window_stats
+)
+from .downsample import downsample, use_webgl
+
+# Paleta do tema escuro usada nas comparações com poucas séries
+THEME_BLUES = ['#3b82f6', '#60a5fa', '#93c5fd', '#2563eb', '#1d4ed8']
+
+# Cores e margens comuns a todos os gráficos (antes repetidas em cada figura)
+THEME_LAYOUT = dict(
+    plot_bgcolor='#0f172a',
+    paper_bgcolor='rgba(0,0,0,0)',
+    margin=dict(l=20, r=20, t=60, b=20),
+    font=dict(color='#cbd5e1'),
+    title=dict(font=dict(size=13, color='#cbd5e1'))
+)
+
+# Partes do plotly_dark que os gráficos do dashboard de fato usam
+_DARK_LAYOUT_KEYS = (
+    'autotypenumbers', 'colorway', 'hoverlabel', 'hovermode', 'coloraxis', 'xaxis', 'yaxis', 'shapedefaults',
+    'annotationdefaults', 'title'
+)
+_DARK_TRACE_TYPES = ('bar', 'scatter', 'scattergl', 'heatmap', 'pie')
+
+
+class FigureCache:
+    """
+    Cache LRU de figuras Plotly prontas, compartilhado entre sessões.
+    Cada entrada guarda o go.Figure e os valores auxiliares usados nos textos
+    ao redor dela, então um acerto pula tanto o pandas quanto a montagem da figura.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._migrated = set()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """
+        `build()` retorna (figura, extras). Num acerto devolve o mesmo go.Figure, que é
+        compartilhado: trate-o como somente leitura. O st.plotly_chart só o serializa
+        (to_dict sem validação, ~1 ms); um dict passaria pela revalidação completa do
+        Plotly (Figure(**spec), ~7 ms) a cada acerto
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            fig, extras = build()
+            with self._lock:
+                self._entries[key] = (fig, extras)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return fig, extras
+
+        return entry
+
+    def migrate(self, data):
+        """
+        Após uma atualização incremental, leva para a versão nova as figuras cujas
+        entidades o delta não tocou; figuras sem lista de entidades dependem do dataset
+        inteiro e são refeitas. Retorna quantas entradas foram reaproveitadas.
+        """
+        delta = getattr(data, 'delta', None)
+        if delta is None:
+            return 0
+        affected = set(delta.entities)
+        with self._lock:
+            if data.version in self._migrated:
+                return 0
+            self._migrated.add(data.version)
+            carried = 0
+            for key in list(self._entries):
+                version, name, countries = key[:3]
+                if version == delta.base_version and countries and affected.isdisjoint(countries):
+                    self._entries[(data.version, *key[1:])] = self._entries[key]
+                    carried += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return carried
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+
+@lru_cache(maxsize=None)
+def dark_template():
+    """
+    Tema escuro compartilhado, montado uma vez por processo. O plotly_dark completo (~7 KB,
+    com padrões de todos os tipos de gráfico) ia serializado em cada figura a cada rerun;
+    este leva só as partes usadas aqui mais THEME_LAYOUT (~1,8 KB)
+    """
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    base = pio.templates['plotly_dark']
+    template = go.layout.Template(
+        layout={key: base.layout[key] for key in _DARK_LAYOUT_KEYS},
+        data={name: base.data[name] for name in _DARK_TRACE_TYPES}
+    )
+    template.layout.update(THEME_LAYOUT)
+    return template
+
+
+def figure_key(data, name, countries=(), year_range=None, params=()):
+    """Chave canônica: versão dos dados + figura + filtros normalizados (países ordenados) + parâmetros"""
+    years = (int(year_range[0]), int(year_range[1])) if year_range is not None else None
+    return (data.version, name, tuple(sorted(countries)), years, tuple(params))
+
+
+def build_top10_figure(data):
+    import plotly.graph_objects as go
+
+    top_10 = get_top_countries(data, top_n=10)
+    total_top10 = top_10.sum()
+    china_share = (top_10.iloc[0] / total_top10 * 100) if len(top_10) > 0 else 0
+    
+    colors = ['#3b82f6' if i == 0 else '#60a5fa' if i < 3 else '#93c5fd' for i in range(len(top_10))]
+    
+    fig = go.Figure(data=[go.Bar(
+        x=top_10.values, 
+        y=top_10.index, 
+        orientation='h',
+        marker=dict(color=colors),
+        text=[f"{val:,}" for val in top_10.values],
+        textposition='outside',
+        textfont=dict(size=11, color='#f8fafc', family='Arial')
+    )])
+    fig.update_layout(
+        xaxis_title="Total de Vendas (unidades)",
+        yaxis_title="",
+        height=450,
+        template=dark_template(),
+        title=f"China representa {china_share:.1f}% do Top 10"
+    )
+    return fig, {'leader_sales': int(top_10.iloc[0]) if len(top_10) > 0 else 0}
+
+
+def build_global_trend_figure(data):
+    import plotly.graph_objects as go
+
+    world_data = get_global_trend(data)
+    first_year_sales = world_data.iloc[0]['Electric cars sold']
+    last_year_sales = world_data.iloc[-1]['Electric cars sold']
+    total_growth = ((last_year_sales - first_year_sales) / first_year_sales * 100)
+    
+    x, y = downsample(world_data['Year'], world_data['Electric cars sold'])
+    scatter = go.Scattergl if use_webgl(len(x)) else go.Scatter
+    fig = go.Figure()
+    fig.add_trace(scatter(
+        x=x,
+        y=y,
+        mode='lines+markers' if len(x) <= 100 else 'lines',
+        name='Vendas Anuais',
+        line=dict(color='#3b82f6', width=3),
+        marker=dict(size=8, color='#60a5fa'),
+        fill='tozeroy',
+        fillcolor='rgba(59,130,246,0.1)',
+        hovertemplate='<b>Ano %{x}</b><br>Vendas: %{y:,}<extra></extra>'
+    ))
+    
+    sales_2020 = world_data.loc[world_data['Year'] == 2020, 'Electric cars sold']
+    if len(sales_2020):
+        fig.add_annotation(
+            x=2020,
+            y=sales_2020.iloc[0],
+            text="Aceleração<br>pós-pandemia",
+            showarrow=True,
+            arrowhead=2,
+            bgcolor="#1e293b",
+            bordercolor="#334155",
+            borderwidth=1,
+            font=dict(color='#cbd5e1')
+        )
+    
+    fig.update_layout(
+        title=dict(
+            text="Crescimento Exponencial: Mercado expandiu 100x desde 2010",
+            font=dict(size=14)
+        ),
+        xaxis_title="Ano",
+        yaxis_title="Vendas Globais (unidades)",
+        height=500,
+        template=dark_template(),
+        hovermode='x unified'
+    )
+    return fig, {
+        'first_year_sales': int(first_year_sales),
+        'last_year_sales': int(last_year_sales),
+        'total_growth': float(total_growth)
+    }
+
+
+def build_periods_figure(data, periods=None, entities=('World',)):
+    """Vendas por período (buckets de anos) de uma ou mais entidades, a partir das somas prefixadas"""
+    import plotly.graph_objects as go
+
+    default = periods is None and list(entities) == ['World']
+    if periods is None:
+        periods = period_buckets(data.year_min, data.year_max, DEFAULT_PERIOD_STARTS)
+    stats = window_stats(data, entities, periods)
+    labels = [f"{start}-{end}" for start, end in periods]
+    names = list(dict.fromkeys(stats['Entity']))
+    
+    if len(names) == 1:
+        values = stats['Total'].to_numpy()
+        bar_colors = ['#60a5fa', '#3b82f6', '#2563eb'] if len(values) == 3 else series_colors(len(values))
+        traces = [go.Bar(
+            x=labels,
+            y=values,
+            marker=dict(color=bar_colors),
+            text=[f"{val:,}" for val in values],
+            textposition='outside',
+            textfont=dict(size=12, color='#f8fafc', family='Arial')
+        )]
+    else:
+        colors = series_colors(len(names))
+        traces = [
+            go.Bar(
+                x=labels,
+                y=group['Total'],
+                name=name,
+                marker=dict(color=colors[i % len(colors)]),
+                hovertemplate='<b>%{fullData.name}</b><br>%{x}: %{y:,}<extra></extra>'
+            )
+            for i, (name, group) in enumerate(stats.groupby('Entity', sort=False))
+        ]
+    
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        title="Período recente (2021-23) supera toda a década anterior" if default else "Vendas por período",
+        yaxis_title="Total de Vendas",
+        height=350,
+        template=dark_template(),
+        barmode='group',
+        showlegend=len(names) > 1
+    )
+    first = stats[stats['Entity'] == names[0]] if names else stats
+    return fig, {'labels': labels, 'entity': names[0] if names else None, 'totals': [int(v) for v in first['Total']]}
+
+
+def build_rolling_figure(rolling, window, stat):
+    """Janela móvel (Ano × Entidade) como linhas, uma por entidade"""
+    import plotly.graph_objects as go
+
+    titles = {'total': 'Total', 'mean': 'Média anual', 'cagr': 'CAGR %'}
+    colors = series_colors(len(rolling.columns))
+    scatter = go.Scattergl if use_webgl(rolling.size) else go.Scatter
+    fig = go.Figure()
+    for i, name in enumerate(rolling.columns):
+        x, y = downsample(rolling.index, rolling[name])
+        fig.add_trace(scatter(
+            x=x,
+            y=y,
+            mode='lines+markers' if len(x) <= 100 else 'lines',
+            name=name,
+            line=dict(color=colors[i % len(colors)], width=2.5),
+            hovertemplate='<b>%{fullData.name}</b><br>Ano %{x}: %{y:,.1f}<extra></extra>'
+        ))
+    fig.update_layout(
+        title=f"{titles[stat]} em janela móvel de {window} anos",
+        xaxis_title="Ano final da janela",
+        height=400,
+        template=dark_template(),
+        hovermode='x unified'
+    )
+    return fig, {}
+
+
+def build_projection_figure(projection, model_label, horizon):
+    """Histórico (marcadores), curva ajustada (pontilhada) e projeção (tracejada) por entidade"""
+    import plotly.graph_objects as go
+
+    names = list(dict.fromkeys(projection['Entity']))
+    colors = series_colors(len(names))
+    styles = {
+        'Histórico': dict(mode='lines+markers', line=dict(width=2.5)),
+        'Ajuste': dict(mode='lines', line=dict(width=1.5, dash='dot')),
+        'Projeção': dict(mode='lines+markers', line=dict(width=2.5, dash='dash')),
+    }
+    scatter = go.Scattergl if use_webgl(len(projection)) else go.Scatter
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        series = projection[projection['Entity'] == name]
+        for kind, style in styles.items():
+            part = series[series['Tipo'] == kind]
+            if part.empty:
+                continue
+            x, y = downsample(part['Year'], part['Electric cars sold'])
+            fig.add_trace(scatter(
+                x=x,
+                y=y,
+                name=f"{name} ({kind.lower()})",
+                legendgroup=name,
+                showlegend=kind != 'Ajuste',
+                mode=style['mode'] if len(x) <= 100 else 'lines',
+                line=dict(color=colors[i % len(colors)], **style['line']),
+                hovertemplate=f'<b>{name}</b> · {kind}<br>Ano %{{x}}: %{{y:,.0f}}<extra></extra>'
+            ))
+    fig.update_layout(
+        title=f"Projeção de {horizon} anos — modelo {model_label}",
+        xaxis_title="Ano",
+        yaxis_title="Vendas",
+        height=450,
+        template=dark_template(),
+        hovermode='x unified'
+    )
+    return fig, {}
+
+
+def series_colors(n):
+    """Azuis do tema até 5 séries; acima disso, n cores distintas amostradas de uma escala"""
+    if n <= len(THEME_BLUES):
+        return THEME_BLUES
+    from plotly.colors import sample_colorscale
+
+    return sample_colorscale('Turbo', [i / (n - 1) for i in range(n)])
+
+
+def downsample_long(long, year_range=None):
+    """Reduz cada entidade de um frame longo (Entity, Year, vendas) à largura do gráfico"""
+    parts = []
+    for entity, group in long.groupby('Entity', observed=True, sort=False):
+        x, y = downsample(group['Year'], group['Electric cars sold'], x_range=year_range)
+        if len(x) == len(group):
+            parts.append(group)
+        else:
+            parts.append(pd.DataFrame({'Entity': entity, 'Year': x, 'Electric cars sold': y}))
+    return pd.concat(parts, ignore_index=True) if parts else long
+
+
+def _comparison_title(countries, year_range):
+    label = ', '.join(countries) if len(countries) <= 5 else f"{len(countries)} países"
+    return f"Trajetória Comparativa: {label} ({year_range[0]}-{year_range[1]})"
+
+
+def build_comparison_line_figure(comparison, year_range):
+    import plotly.express as px
+
+    # Ordem canônica (países ordenados) para a figura não depender da ordem de seleção
+    countries = list(comparison.pivot.columns.drop('Total Anual'))
+    long = downsample_long(comparison.long, year_range)
+    fig = px.line(
+        long,
+        x='Year',
+        y='Electric cars sold',
+        color='Entity',
+        markers=len(countries) <= 20 and len(long) <= 100 * len(countries),
+        render_mode='webgl' if use_webgl(len(long)) else 'svg',
+        labels={'Electric cars sold': 'Vendas Anuais', 'Year': 'Ano', 'Entity': 'País'},
+        color_discrete_sequence=series_colors(len(countries))
+    )
+    
+    fig.update_layout(
+        title=_comparison_title(countries, year_range),
+        height=500,
+        template=dark_template(),
+        hovermode='x unified' if len(countries) <= 20 else 'closest',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            bgcolor='#1e293b',
+            bordercolor='#334155',
+            borderwidth=1
+        ),
+        margin=dict(t=80)
+    )
+    
+    fig.update_traces(line=dict(width=2.5 if len(countries) <= 20 else 1.2), marker=dict(size=7))
+    fig.update_xaxes(gridcolor='#1e293b', linecolor='#334155')
+    fig.update_yaxes(gridcolor='#1e293b', linecolor='#334155')
+    return fig, {}
+
+
+def build_comparison_heatmap_figure(comparison, year_range):
+    """Mapa de calor Entidade × Ano: legível com centenas de países, ordenado por vendas"""
+    import plotly.graph_objects as go
+
+    order = list(comparison.totals.index)
+    z = comparison.pivot.drop(columns='Total Anual')[order].T
+    fig = go.Figure(data=[go.Heatmap(
+        z=z.values,
+        x=z.columns,
+        y=z.index,
+        colorscale='Blues',
+        hovertemplate='<b>%{y}</b><br>Ano %{x}<br>Vendas: %{z:,.0f}<extra></extra>',
+        colorbar=dict(title='Vendas')
+    )])
+    fig.update_layout(
+        title=_comparison_title(order, year_range),
+        height=max(400, 18 * len(order) + 120),
+        template=dark_template(),
+        yaxis=dict(autorange='reversed')
+    )
+    return fig, {}
+
+
+def build_market_share_figure(comparison, max_slices=12):
+    """Participação no total selecionado; além de `max_slices`, o restante vira 'Outros'"""
+    import plotly.graph_objects as go
+
+    market_share = comparison.totals
+    if len(market_share) > max_slices:
+        head = market_share.iloc[:max_slices - 1]
+        market_share = pd.concat([head, pd.Series({'Outros': market_share.iloc[max_slices - 1:].sum()})])
+    
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=market_share.index,
+        values=market_share.values,
+        hole=0.4,
+        sort=False,
+        textinfo='label+percent',
+        hovertemplate='<b>%{label}</b><br>%{percent}<br>Vendas: %{value:,.0f}<extra></extra>',
+        marker=dict(colors=series_colors(len(market_share)))
+    )])
+    
+    fig_pie.update_layout(
+        height=700,
+        template=dark_template()
+    )
+    return fig_pie, {
+        'leader': comparison.shares.index[0],
+        'leader_pct': float(comparison.shares.iloc[0])
+    }
@@ -0,0 +1,204 @@
+"""
+Crescimento e projeções de todas as entidades numa única passada NumPy sobre a matriz
+Entity×Year: CAGR, variação ano a ano, aceleração e ajuste log-linear ou logístico.
+Os ajustes são calculados uma vez por versão dos dados e reaproveitados por todas as sessões.
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .analytics import _cagr
+
+# Tetos candidatos do ajuste logístico, em múltiplos do maior valor observado da entidade
+LOGISTIC_CAPS = np.array([1.1, 1.25, 1.5, 2, 3, 5, 10, 25, 100])
+
+# Ajustes exigem ao menos este número de anos com vendas positivas
+MIN_FIT_POINTS = 3
+
+DEFAULT_HORIZON = 5
+
+MODELS = {'loglinear': 'Log-linear (exponencial)', 'logistic': 'Logística (com teto)'}
+
+# Parâmetros por entidade (arrays alinhados a `entities`); t = ano - year_min
+GrowthFit = namedtuple('GrowthFit', [
+    'version', 'entities', 'year_min', 'year_max', 'metrics',
+    'log_a', 'log_b', 'log_r2', 'cap', 'logi_a', 'logi_b', 'logi_r2'
+])
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _wls(t, z, w):
+    """Mínimos quadrados ponderados z ≈ a + b·t em cada linha (pesos 0/1 em `w`)"""
+    n = w.sum(axis=-1)
+    st = (w * t).sum(axis=-1)
+    sz = (w * z).sum(axis=-1)
+    stt = (w * t * t).sum(axis=-1)
+    stz = (w * t * z).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        b = (n * stz - st * sz) / (n * stt - st * st)
+        a = (sz - b * st) / n
+    return a, b
+
+
+def _r2(z, fitted, w):
+    """R² (escala log) dos ajustes de cada linha"""
+    n = np.maximum(w.sum(axis=-1), 1)
+    mean = (w * z).sum(axis=-1) / n
+    ss_res = (w * (z - fitted) ** 2).sum(axis=-1)
+    ss_tot = (w * (z - mean[..., None]) ** 2).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.nan)
+
+
+def _last_valid(values, valid):
+    """Último valor válido de cada linha e o anterior a ele (NaN quando não há)"""
+    n_cols = values.shape[1]
+    rows = np.arange(len(values))
+    last = n_cols - 1 - valid[:, ::-1].argmax(axis=1)
+    has_last = valid.any(axis=1)
+    valid = valid.copy()
+    valid[rows, last] = False
+    prev = n_cols - 1 - valid[:, ::-1].argmax(axis=1)
+    has_prev = has_last & valid.any(axis=1)
+    return (np.where(has_last, values[rows, last], np.nan),
+            np.where(has_prev, values[rows, prev], np.nan))
+
+
+def fit_growth(data):
+    """
+    Métricas de crescimento e parâmetros dos dois modelos para todas as entidades.
+    Tudo é vetorizado sobre a matriz (entidades × anos); o ajuste logístico testa os tetos
+    de LOGISTIC_CAPS ao mesmo tempo (entidades × tetos × anos) e fica com o de menor erro.
+    """
+    values, present = data.block(np.arange(len(data.entities)))
+    values = values.astype(np.float64)
+    t = (data.years - data.year_min).astype(np.float64)
+    n_years = len(t)
+    rows = np.arange(len(values))
+
+    # Primeiro e último ano com registro
+    has_any = present.any(axis=1)
+    first = present.argmax(axis=1)
+    last = n_years - 1 - present[:, ::-1].argmax(axis=1)
+    first_sales = values[rows, first]
+    last_sales = values[rows, last]
+
+    # Variação ano a ano entre anos consecutivos com registro e base positiva
+    prev, curr = values[:, :-1], values[:, 1:]
+    yoy_valid = present[:, :-1] & present[:, 1:] & (prev > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yoy = np.where(yoy_valid, (curr / prev - 1) * 100, np.nan)
+    yoy_last, yoy_prev = _last_valid(yoy, yoy_valid)
+
+    # Log-linear: log(vendas) ≈ a + b·t nos anos com vendas positivas
+    positive = present & (values > 0)
+    w = positive.astype(np.float64)
+    fit_ok = positive.sum(axis=1) >= MIN_FIT_POINTS
+    log_v = np.log(np.where(positive, values, 1.0))
+    log_a, log_b = _wls(t, log_v, w)
+    log_r2 = _r2(log_v, log_a[:, None] + log_b[:, None] * t, w)
+
+    # Logística com teto K fixo: log(K/v - 1) ≈ a + b·t; erro comparado em log(vendas)
+    peak = np.where(positive, values, 0).max(axis=1)
+    caps = np.maximum(peak, 1)[:, None] * LOGISTIC_CAPS  # entidades × tetos
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.log(caps[:, :, None] / np.where(positive, values, 1.0)[:, None, :] - 1)
+    z = np.where(positive[:, None, :], z, 0.0)
+    wk = np.broadcast_to(w[:, None, :], z.shape)
+    k_a, k_b = _wls(t, z, wk)
+    with np.errstate(over='ignore', invalid='ignore'):
+        fitted = np.log(caps)[:, :, None] - np.log1p(np.exp(k_a[..., None] + k_b[..., None] * t))
+    sse = (wk * (log_v[:, None, :] - fitted) ** 2).sum(axis=-1)
+    best = np.nan_to_num(sse, nan=np.inf).argmin(axis=1)
+    cap = caps[rows, best]
+    logi_a, logi_b = k_a[rows, best], k_b[rows, best]
+    logi_r2 = _r2(log_v, fitted[rows, best], w)
+
+    nan = np.full(len(values), np.nan)
+    log_a, log_b, log_r2 = (np.where(fit_ok, x, nan) for x in (log_a, log_b, log_r2))
+    cap, logi_a, logi_b, logi_r2 = (np.where(fit_ok, x, nan) for x in (cap, logi_a, logi_b, logi_r2))
+
+    metrics = pd.DataFrame({
+        'Entity': data.entities,
+        'Agregado': np.asarray(data.is_aggregate),
+        'Primeiro Ano': np.where(has_any, data.years[first], 0),
+        'Último Ano': np.where(has_any, data.years[last], 0),
+        'Vendas (último ano)': np.where(has_any, last_sales, np.nan),
+        'CAGR %': _cagr(first_sales, last_sales, last - first),
+        'YoY %': yoy_last,
+        'Aceleração (p.p.)': yoy_last - yoy_prev,
+        'Tendência Log-Linear %': (np.exp(log_b) - 1) * 100,
+        'R² Log-Linear': log_r2,
+        'Teto Logístico': cap,
+        'R² Logístico': logi_r2
+    })
+    return GrowthFit(
+        data.version, np.asarray(data.entities), data.year_min, data.year_max, metrics,
+        log_a, log_b, log_r2, cap, logi_a, logi_b, logi_r2
+    )
+
+
+def get_growth_fit(data):
+    """`fit_growth` calculado uma vez por versão dos dados (a versão anterior é descartada)"""
+    with _cache_lock:
+        fit = _cache.get(data.version)
+    if fit is None:
+        fit = fit_growth(data)
+        with _cache_lock:
+            _cache.clear()
+            _cache[data.version] = fit
+    return fit
+
+
+def growth_metrics(data, countries_only=False):
+    """Tabela de métricas de todas as entidades, da maior para a menor venda no último ano"""
+    metrics = get_growth_fit(data).metrics
+    if countries_only:
+        metrics = metrics[~metrics['Agregado']]
+    return metrics.sort_values('Vendas (último ano)', ascending=False, ignore_index=True)
+
+
+def project(fit, rows, years, model='loglinear'):
+    """Valores ajustados de `rows` em `years` (matriz linhas × anos) pelo modelo escolhido"""
+    if model not in MODELS:
+        raise ValueError(f"Modelo desconhecido: {model}")
+    t = np.asarray(years, dtype=np.float64) - fit.year_min
+    if model == 'loglinear':
+        with np.errstate(over='ignore'):
+            return np.exp(fit.log_a[rows, None] + fit.log_b[rows, None] * t)
+    with np.errstate(over='ignore'):
+        return fit.cap[rows, None] / (1 + np.exp(fit.logi_a[rows, None] + fit.logi_b[rows, None] * t))
+
+
+def projection_frame(data, entities, horizon=5, model='loglinear'):
+    """
+    Frame longo (Entity, Year, vendas, Tipo) com o histórico e a projeção de `horizon`
+    anos após o último ano do dataset; a curva ajustada cobre o histórico para comparação
+    """
+    fit = get_growth_fit(data)
+    names = [e for e in entities if e in data.entity_index]
+    rows = np.array([data.entity_index[e] for e in names], dtype=np.int64)
+    values, present = data.block(rows)
+    future = np.arange(data.year_max + 1, data.year_max + 1 + max(int(horizon), 0))
+    all_years = np.concatenate([data.years, future])
+    fitted = project(fit, rows, all_years, model)
+
+    r, c = np.nonzero(present)
+    history = pd.DataFrame({
+        'Entity': np.asarray(names, dtype=object)[r],
+        'Year': data.years[c],
+        'Electric cars sold': values[r, c].astype(np.float64),
+        'Tipo': 'Histórico'
+    })
+    fr, fc = np.nonzero(np.isfinite(fitted))
+    projected = pd.DataFrame({
+        'Entity': np.asarray(names, dtype=object)[fr],
+        'Year': all_years[fc],
+        'Electric cars sold': fitted[fr, fc],
+        'Tipo': np.where(all_years[fc] > data.year_max, 'Projeção', 'Ajuste')
+    })
+    return pd.concat([history, projected], ignore_index=True)
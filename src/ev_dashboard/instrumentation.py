@@ -0,0 +1,171 @@
+"""
+Instrumentação leve do caminho quente: spans por execução (rerun), histogramas
+acumulados no processo com exportação no formato texto do Prometheus, e captura
+opcional de cProfile/tracemalloc para uma única execução.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from .data import _atomic_write
+
+# Limites dos buckets (segundos), do sub-milissegundo ao lento perceptível
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+
+class HistogramRegistry:
+    """Histogramas de duração por nome de span, compartilhados por todas as sessões"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def to_prometheus(self, metric="ev_dashboard_span_seconds"):
+        """Formato texto de exposição do Prometheus (buckets cumulativos, _sum e _count)"""
+        lines = [
+            f"# HELP {metric} Duração das etapas de renderização do dashboard.",
+            f"# TYPE {metric} histogram"
+        ]
+        with self._lock:
+            for name in sorted(self._histograms):
+                histogram = self._histograms[name]
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{span="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{span="{label}"}} {histogram.sum}')
+                lines.append(f'{metric}_count{{span="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Grava os histogramas atomicamente (ex.: diretório do textfile collector)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, [self.to_prometheus().encode()])
+
+
+REGISTRY = HistogramRegistry()
+
+
+class Tracer:
+    """Spans de uma execução do script; cada span também alimenta o histograma global"""
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self.spans = []  # (nome, profundidade, duração em segundos), na ordem de início
+        self._depth = 0
+        self._started = time.perf_counter()
+        self._finished = None
+
+    @property
+    def finished(self):
+        """True após finish(): reruns só de fragmento não devem mais registrar aqui"""
+        return self._finished is not None
+
+    def finish(self):
+        """Encerra o trace da execução; total() passa a ser fixo"""
+        if self._finished is None:
+            self._finished = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        index = len(self.spans)
+        self.spans.append((name, self._depth, 0.0))
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self._depth -= 1
+            self.spans[index] = (name, self._depth, duration)
+            self.registry.observe(name, duration)
+
+    def total(self):
+        return (self._finished or time.perf_counter()) - self._started
+
+
+# cProfile e tracemalloc são globais ao processo: uma captura por vez entre as sessões
+_capture_lock = threading.Lock()
+
+
+class ProfileCapture:
+    """cProfile + tracemalloc para uma única execução (opt-in, tem overhead alto)"""
+
+    def __init__(self):
+        self._profiler = cProfile.Profile()
+        self._active = False
+
+    def start(self):
+        """Inicia a captura; None se outra sessão já está capturando"""
+        if not _capture_lock.acquire(blocking=False):
+            return None
+        self._active = True
+        tracemalloc.start()
+        self._profiler.enable()
+        return self
+
+    def stop(self, output_dir=None, top=25):
+        """
+        Encerra a captura; grava o .prof em `output_dir` (se dado) e retorna o relatório.
+        Chame num `finally`: o profiler e o tracemalloc são desligados mesmo com erro.
+        """
+        if not self._active:
+            return None
+        try:
+            self._profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            self._active = False
+            _capture_lock.release()
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(top)
+
+        prof_path = None
+        if output_dir is not None:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            prof_path = output_dir / f"rerun-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+            stats.dump_stats(prof_path)
+
+        allocations = [str(stat) for stat in snapshot.statistics('lineno')[:top]]
+        return {
+            'profile': stream.getvalue(),
+            'allocations': allocations,
+            'peak_alloc_mb': peak / 2**20,
+            'prof_path': str(prof_path) if prof_path else None
+        }
@@ -0,0 +1,437 @@
+"""
+Teste de carga local: N sessões simultâneas contra um servidor Streamlit real (um worker),
+cada uma com um cliente WebSocket headless que segue um roteiro de interação realista
+(troca de países, arraste do período, abas, visualizações da aba Dados e botão de
+atualizar). Mede a latência de cada rerun (p50/p95/p99), a vazão e o crescimento de
+memória (RSS) do servidor por sessão; vários níveis de N mostram o ponto de saturação.
+O botão de atualizar baixa de um servidor HTTP local que serve cópias dos CSVs em data/,
+nunca do OWID/GitHub.
+
+    python -m ev_dashboard loadtest --sessions 1,5,10,20 --output load.json
+    python -m ev_dashboard loadtest --compare load_anterior.json
+"""
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:  # Sem websockets: teste de carga indisponível
+    ws_connect = None
+
+from .data import DATA_DIR
+from .registry import DATASETS, PRIMARY_DATASET
+
+APP_PATH = Path(__file__).parent.parent / "app.py"
+DEFAULT_SESSIONS = [1, 5, 10, 20]
+
+# Rótulos dos widgets do roteiro (src/app.py)
+COUNTRIES_LABEL = "Países para comparar:"
+YEARS_LABEL = "Período de análise:"
+REFRESH_LABEL = "Atualizar Dados da API"
+VIEW_LABEL = "Escolha o tipo de visualização:"
+DATA_TAB = "Dados"
+
+# Ganho mínimo de vazão ao aumentar as sessões; abaixo disso o worker está saturado
+SATURATION_GAIN = 1.05
+
+FINISHED = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+            ForwardMsg.FINISHED_WITH_COMPILE_ERROR)
+
+
+def _rss_mb(pid):
+    """RSS atual de um processo em MB (Linux); None se indisponível"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def local_upstream(data_dir=DATA_DIR):
+    """
+    Servidor HTTP local no lugar das fontes remotas do registro: serve cópias dos CSVs
+    presentes em `data_dir` (If-Modified-Since responde 304, como o upstream) e entrega as
+    variáveis de ambiente que apontam o app para ele. Datasets sem CSV local ficam sem origem.
+    """
+    with tempfile.TemporaryDirectory(prefix="ev-upstream-") as root:
+        root = Path(root)
+        handler = partial(_QuietHandler, directory=str(root))
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        sources = {}
+        for dataset in DATASETS.values():
+            local = Path(data_dir) / dataset.filename
+            if local.exists():
+                shutil.copy2(local, root / dataset.filename)
+                sources[dataset.name] = f"{url}/{dataset.filename}"
+            else:
+                sources[dataset.name] = None
+        registry_path = root / "registry.json"
+        registry_path.write_text(json.dumps({
+            name: {'source': source} for name, source in sources.items() if name != PRIMARY_DATASET
+        }))
+
+        thread = threading.Thread(target=server.serve_forever, name='ev-local-upstream', daemon=True)
+        thread.start()
+        try:
+            env = {'EV_DASHBOARD_DATASETS': str(registry_path)}
+            if sources[PRIMARY_DATASET]:
+                env['EV_DASHBOARD_API_URL'] = sources[PRIMARY_DATASET]
+            yield env
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def start_server(app_path=APP_PATH, port=None, timeout=60, env=None):
+    """
+    Sobe `streamlit run` em modo headless e espera o health check; retorna (processo, url).
+    `env` acrescenta variáveis ao ambiente do servidor
+    """
+    import requests  # Só quando um servidor é de fato iniciado
+
+    port = port or _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(app_path), "--server.headless=true",
+         f"--server.port={port}", "--server.address=127.0.0.1", "--server.fileWatcherType=none",
+         "--browser.gatherUsageStats=false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env={**os.environ, **(env or {})}
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Servidor Streamlit encerrou com código {process.returncode}")
+        try:
+            if requests.get(f"{url}/_stcore/health", timeout=1).ok:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Servidor Streamlit não respondeu ao health check")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+class Session:
+    """
+    Cliente headless de uma sessão: envia reruns com o estado dos widgets (como o frontend)
+    e lê os deltas até o fim da execução, registrando os widgets exibidos e os erros
+    """
+
+    def __init__(self, url):
+        self.url = url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.ws = None
+        self.widgets = {}  # rótulo -> (tipo, proto, fragment_id)
+        self.tabs_id = None
+        self.errors = 0
+        self.bytes_received = 0
+        self._states = {}  # id -> WidgetState enviado em todos os reruns
+
+    async def connect(self):
+        self.ws = await ws_connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def widget(self, label):
+        return self.widgets[label][1]
+
+    async def rerun(self, fragment_id=""):
+        """Um rerun completo (ou só do fragmento); retorna a latência em segundos"""
+        msg = BackMsg()
+        msg.rerun_script.widget_states.widgets.extend(self._states.values())
+        msg.rerun_script.fragment_id = fragment_id
+        # Botões disparam uma vez; não voltam nos reruns seguintes
+        self._states = {k: v for k, v in self._states.items() if v.WhichOneof('value') != 'trigger_value'}
+
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        seen = set()
+        while True:
+            raw = await self.ws.recv()
+            self.bytes_received += len(raw)
+            forward = ForwardMsg.FromString(raw)
+            kind = forward.WhichOneof('type')
+            if kind == 'delta':
+                self._read_delta(forward.delta, seen)
+            elif kind == 'script_finished' and forward.script_finished in FINISHED:
+                break
+        latency = time.perf_counter() - started
+
+        if not fragment_id:
+            # Como no navegador: widgets que saíram da tela perdem o estado
+            self._states = {k: v for k, v in self._states.items() if k in seen}
+        return latency
+
+    def _read_delta(self, delta, seen):
+        if delta.WhichOneof('type') == 'add_block':
+            if delta.add_block.WhichOneof('type') == 'tab_container' and delta.add_block.tab_container.id:
+                self.tabs_id = delta.add_block.tab_container.id
+                seen.add(self.tabs_id)
+            return
+        if delta.WhichOneof('type') != 'new_element':
+            return
+        element = delta.new_element
+        kind = element.WhichOneof('type')
+        if kind == 'exception':
+            self.errors += 1
+            return
+        proto = getattr(element, kind)
+        if getattr(proto, 'id', None) and getattr(proto, 'label', None) is not None:
+            self.widgets[proto.label] = (kind, proto, delta.fragment_id)
+            seen.add(proto.id)
+
+    def _set(self, label, **value):
+        kind, proto, fragment_id = self.widgets[label]
+        state = WidgetState(id=proto.id)
+        for field, v in value.items():
+            if field in ('string_array_value', 'double_array_value'):
+                getattr(state, field).data.extend(v)
+            else:
+                setattr(state, field, v)
+        self._states[proto.id] = state
+        return fragment_id
+
+    async def select(self, label, values):
+        self._set(label, string_array_value=values)
+        return await self.rerun()
+
+    async def slide(self, label, values):
+        self._set(label, double_array_value=[float(v) for v in values])
+        return await self.rerun()
+
+    async def choose(self, label, option):
+        return await self.rerun(self._set(label, string_value=option))
+
+    async def press(self, label):
+        return await self.rerun(self._set(label, trigger_value=True))
+
+    async def open_tab(self, label):
+        self._states[self.tabs_id] = WidgetState(id=self.tabs_id, string_value=label)
+        return await self.rerun()
+
+
+async def run_session(url, seed, rounds, think, record):
+    """Roteiro de uma sessão; `record(etapa, latência)` recebe cada rerun"""
+    rng = random.Random(seed)
+    session = Session(url)
+    await session.connect()
+
+    async def step(name, action):
+        record(name, await action)
+        if think:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+
+    try:
+        await step('abrir', session.rerun())
+        for _ in range(rounds):
+            options = list(session.widget(COUNTRIES_LABEL).options)
+            picked = rng.sample(options, k=min(len(options), rng.randint(2, 6)))
+            await step('países', session.select(COUNTRIES_LABEL, picked))
+
+            # Arraste: o início do período passa por alguns anos até parar
+            slider = session.widget(YEARS_LABEL)
+            low, high = int(slider.min), int(slider.max)
+            target = rng.randint(low, high - 1)
+            for year in np.linspace(low, target, num=3).round().astype(int):
+                await step('período', session.slide(YEARS_LABEL, [year, high]))
+
+            await step('aba', session.open_tab(DATA_TAB))
+            for option in session.widget(VIEW_LABEL).options:
+                await step('visualização', session.choose(VIEW_LABEL, option))
+            await step('atualizar', session.press(REFRESH_LABEL))
+            for tab in ("Comparação", "Projeções", "Tendências", "Visão Geral"):
+                await step('aba', session.open_tab(tab))
+        return session
+    except BaseException:
+        await session.close()
+        raise
+
+
+async def _run_level(url, n_sessions, rounds, think, seed, pid):
+    latencies = {}
+
+    def record(name, latency):
+        latencies.setdefault(name, []).append(latency)
+
+    rss_samples = []
+
+    async def sample_rss():
+        while True:
+            rss = _rss_mb(pid) if pid else None
+            if rss is not None:
+                rss_samples.append(rss)
+            await asyncio.sleep(0.2)
+
+    # Aquecimento: a primeira sessão carrega os dados e os caches do processo
+    warm = await run_session(url, seed - 1, 0, 0, lambda name, latency: None)
+    await warm.close()
+    rss_base = _rss_mb(pid) if pid else None
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_session(url, seed + i, rounds, think, record) for i in range(n_sessions)),
+        return_exceptions=True
+    )
+    wall = time.perf_counter() - started
+    # Memória medida com as N sessões ainda abertas
+    rss_after = _rss_mb(pid) if pid else None
+    sampler.cancel()
+
+    sessions = [r for r in results if isinstance(r, Session)]
+    failures = [r for r in results if not isinstance(r, Session)]
+    for session in sessions:
+        await session.close()
+
+    everything = np.array([v for values in latencies.values() for v in values]) * 1000
+    return {
+        'sessions': n_sessions,
+        'reruns': int(everything.size),
+        'failed_sessions': len(failures),
+        'failures': sorted({f"{type(f).__name__}: {f}" for f in failures})[:5],
+        'app_errors': sum(s.errors for s in sessions),
+        'wall_s': wall,
+        'throughput_rps': everything.size / wall if wall > 0 else 0.0,
+        'bytes_per_rerun': sum(s.bytes_received for s in sessions) / everything.size if everything.size else 0,
+        'latency_ms': _latency_stats(everything),
+        'steps': {name: _latency_stats(np.array(values) * 1000) for name, values in latencies.items()},
+        'rss_base_mb': rss_base,
+        'rss_after_mb': rss_after,
+        'rss_peak_mb': max(rss_samples, default=rss_after),
+        'rss_per_session_mb': (rss_after - rss_base) / n_sessions if rss_base and rss_after else None
+    }
+
+
+def _latency_stats(values):
+    if values.size == 0:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'mean': float(values.mean()), 'max': float(values.max())}
+
+
+def saturation_point(levels):
+    """Maior N antes de a vazão parar de crescer (ganho < SATURATION_GAIN); None se não saturou"""
+    for previous, current in zip(levels, levels[1:]):
+        if current['throughput_rps'] < previous['throughput_rps'] * SATURATION_GAIN:
+            return previous['sessions']
+    return None
+
+
+def run_loadtest(levels=DEFAULT_SESSIONS, rounds=2, think=0.0, seed=0, app_path=APP_PATH, url=None, pid=None):
+    """
+    Executa cada nível de sessões simultâneas. Sem `url`, cada nível usa um servidor novo
+    (memória medida do zero) e busca os dados num upstream local (local_upstream); com `url`,
+    usa o servidor existente e a origem configurada nele (RSS só com `pid`).
+    """
+    if ws_connect is None:
+        raise RuntimeError("Instale o websockets para rodar o teste de carga")
+    results = []
+    with local_upstream() as upstream_env:
+        for n_sessions in levels:
+            process = None
+            if url is None:
+                process, level_url = start_server(app_path, env=upstream_env)
+                level_pid = process.pid
+            else:
+                level_url, level_pid = url, pid
+            try:
+                results.append(asyncio.run(_run_level(level_url, n_sessions, rounds, think, seed, level_pid)))
+            finally:
+                if process is not None:
+                    stop_server(process)
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'rounds': rounds,
+            'think_s': think,
+            'backend': os.environ.get('EV_DASHBOARD_BACKEND', 'memory')
+        },
+        'levels': results,
+        'saturation_sessions': saturation_point(results)
+    }
+
+
+def compare(current, baseline, threshold=1.2):
+    """Linhas (sessões, base, atual, razão) com p95 pior que `threshold` × o da base"""
+    base = {level['sessions']: level['latency_ms'].get('p95') for level in baseline['levels']}
+    regressions = []
+    for level in current['levels']:
+        before, after = base.get(level['sessions']), level['latency_ms'].get('p95')
+        if before and after and after / before > threshold:
+            regressions.append((level['sessions'], before, after, after / before))
+    return regressions
+
+
+def format_report(results):
+    lines = []
+    for level in results['levels']:
+        latency = level['latency_ms']
+        memory = ""
+        if level['rss_per_session_mb'] is not None:
+            memory = (f", RSS {level['rss_base_mb']:,.0f} → {level['rss_after_mb']:,.0f} MB "
+                      f"(+{level['rss_per_session_mb']:,.1f} MB/sessão, pico {level['rss_peak_mb']:,.0f} MB)")
+        lines.append(
+            f"{level['sessions']:>4} sessões: {level['reruns']:,} reruns em {level['wall_s']:.1f} s "
+            f"({level['throughput_rps']:.1f}/s), p50 {latency.get('p50', 0):.0f} ms, "
+            f"p95 {latency.get('p95', 0):.0f} ms, p99 {latency.get('p99', 0):.0f} ms, "
+            f"{level.get('bytes_per_rerun', 0) / 1024:,.1f} KB/rerun{memory}"
+        )
+        if level['failed_sessions'] or level['app_errors']:
+            lines.append(f"      {level['failed_sessions']} sessões falharam, {level['app_errors']} exceções no app")
+            lines.extend(f"      {failure}" for failure in level['failures'])
+        for name, stats in level['steps'].items():
+            lines.append(f"      {name:<14} p50 {stats['p50']:8.0f} ms  p95 {stats['p95']:8.0f} ms")
+    saturation = results['saturation_sessions']
+    lines.append(
+        f"Saturação: vazão para de crescer após {saturation} sessões" if saturation
+        else "Saturação: não atingida nos níveis testados"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,253 @@
+"""
+Registro de datasets: origem (URL ou caminho local), esquema e política de atualização de
+cada indicador. Os downloads rodam em paralelo (pool de threads) e cada indicador extra é
+alinhado uma única vez aos índices Entity×Year do dataset principal, com cache compartilhado.
+"""
+import copy
+import hashlib
+import io
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+from .data import (
+    API_URL, CACHE_MAX_AGE_DAYS, CSV_PATH, _atomic_write, _download_lock, _file_sha256, refresh_csv,
+    validate_csv
+)
+
+KEY_COLUMNS = ('Entity', 'Code', 'Year')
+
+# `column`: coluna de valores no CSV; None = a única coluna além de Entity/Code/Year
+# `required`: falha ao buscar interrompe a atualização (os demais seguem com a versão anterior)
+Dataset = namedtuple('Dataset', ['name', 'label', 'source', 'filename', 'column', 'max_age_days', 'required'])
+
+# Indicador extra alinhado ao dataset principal (valores e presença: entidades × anos)
+Metric = namedtuple('Metric', ['label', 'values', 'present'])
+
+PRIMARY_DATASET = 'sales'
+
+DATASETS = {
+    'sales': Dataset(
+        'sales', 'Carros elétricos vendidos', API_URL, CSV_PATH.name, 'Electric cars sold',
+        CACHE_MAX_AGE_DAYS, True
+    ),
+    'stock': Dataset(
+        'stock', 'Frota de carros elétricos',
+        'https://ourworldindata.org/grapher/electric-car-stocks.csv', 'ev_stock.csv', None, 30, False
+    ),
+    'sales_share': Dataset(
+        'sales_share', 'Participação nas vendas de carros novos (%)',
+        'https://ourworldindata.org/grapher/electric-car-sales-share.csv', 'ev_sales_share.csv', None, 30, False
+    ),
+    # Sem fonte pública estável no OWID: configure a URL ou o caminho do CSV
+    'charging_points': Dataset(
+        'charging_points', 'Pontos de recarga públicos',
+        os.environ.get('EV_DASHBOARD_CHARGING_POINTS_SOURCE'), 'ev_charging_points.csv', None, 30, False
+    ),
+}
+
+# JSON opcional com entradas novas ou sobrescritas: {"nome": {"source": ..., "column": ...}}
+REGISTRY_FILE = os.environ.get('EV_DASHBOARD_DATASETS')
+
+# Downloads simultâneos (um por dataset até este limite)
+FETCH_MAX_WORKERS = int(os.environ.get('EV_DASHBOARD_FETCH_WORKERS', '4'))
+
+
+def load_registry(path=REGISTRY_FILE):
+    """Datasets do registro padrão com as entradas do arquivo JSON `path` aplicadas por cima"""
+    datasets = dict(DATASETS)
+    if path:
+        for name, fields in json.loads(Path(path).read_text()).items():
+            base = datasets.get(name) or Dataset(name, name, None, f"{name}.csv", None, CACHE_MAX_AGE_DAYS, False)
+            datasets[name] = base._replace(**fields)
+    return datasets
+
+
+def active_datasets(datasets=None):
+    """Datasets com origem configurada, o principal primeiro"""
+    datasets = load_registry() if datasets is None else datasets
+    return sorted(
+        (d for d in datasets.values() if d.source),
+        key=lambda d: d.name != PRIMARY_DATASET
+    )
+
+
+def value_column(columns, dataset):
+    """Coluna de valores do CSV segundo o esquema do dataset"""
+    if dataset.column is not None:
+        return dataset.column
+    candidates = [c for c in columns if c not in KEY_COLUMNS]
+    if len(candidates) != 1:
+        raise ValueError(f"{dataset.name}: esperada uma coluna de valores, encontradas {candidates}")
+    return candidates[0]
+
+
+def validate_metric_csv(path, dataset):
+    """Valida o CSV de um indicador extra antes de substituir o atual"""
+    try:
+        df = pd.read_csv(path, nrows=1000)
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f"{dataset.name}: CSV inválido: {e}") from e
+    missing = {'Entity', 'Year'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{dataset.name}: colunas ausentes no CSV: {sorted(missing)}")
+    column = value_column(df.columns, dataset)
+    if column not in df.columns or df[column].dropna().empty:
+        raise ValueError(f"{dataset.name}: CSV sem valores em '{column}'")
+
+
+def _is_url(source):
+    return urlparse(str(source)).scheme in ('http', 'https')
+
+
+def _copy_local(source, path, validate):
+    """Copia um CSV local (ou file://) quando o conteúdo muda; True se substituiu"""
+    source = Path(urlparse(source).path if str(source).startswith('file://') else source)
+    if path.exists() and _file_sha256(source) == _file_sha256(path):
+        return False
+    with _download_lock(path.with_suffix('.lock')):
+        with open(source, 'rb') as f:
+            _atomic_write(path, iter(lambda: f.read(1024 * 1024), b''), validate=validate)
+    return True
+
+
+def fetch_dataset(dataset, data_dir, force=False, timeout=30):
+    """Atualiza o CSV local de um dataset conforme sua política; True se o arquivo mudou"""
+    path = Path(data_dir) / dataset.filename
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if dataset.name == PRIMARY_DATASET:
+        validate = validate_csv
+    else:
+        def validate(tmp_path):
+            validate_metric_csv(tmp_path, dataset)
+    if _is_url(dataset.source):
+        return refresh_csv(
+            path, dataset.source, max_age_days=0 if force else dataset.max_age_days,
+            timeout=timeout, validate=validate
+        )
+    return _copy_local(dataset.source, path, validate)
+
+
+def fetch_datasets(datasets, data_dir, force=False, timeout=30, max_workers=FETCH_MAX_WORKERS):
+    """
+    Busca todos os datasets ao mesmo tempo; o tempo total é o do mais lento, não a soma.
+    Retorna {nome: True/False (mudou) ou a exceção}; erro em dataset `required` é relançado.
+    """
+    datasets = list(datasets)
+    if not datasets:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(datasets))),
+                            thread_name_prefix='ev-fetch') as pool:
+        futures = {d.name: pool.submit(fetch_dataset, d, data_dir, force, timeout) for d in datasets}
+    results = {name: future.exception() or future.result() for name, future in futures.items()}
+    for dataset in datasets:
+        if dataset.required and isinstance(results[dataset.name], BaseException):
+            raise results[dataset.name]
+    return results
+
+
+def metrics_signature(datasets, data_dir):
+    """Tamanho e mtime dos CSVs extras: muda quando algum é substituído (sem ler os arquivos)"""
+    signature = []
+    for dataset in datasets:
+        if dataset.name == PRIMARY_DATASET:
+            continue
+        try:
+            stat = (Path(data_dir) / dataset.filename).stat()
+            signature.append((dataset.name, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append((dataset.name, None, None))
+    return hashlib.sha256(repr(signature).encode()).hexdigest()
+
+
+def align_metric(store, df, column):
+    """
+    Valores de `column` espalhados na grade Entity×Year do store por índice (sem join):
+    entidades e anos fora do dataset principal são descartados
+    """
+    n_years = len(store.years)
+    rows = pd.Index(store.entities).get_indexer(df['Entity']).astype(np.int64)  # -1: fora do principal
+    cols = df['Year'].to_numpy(dtype=np.int64) - store.year_min
+    raw = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+    keep = (rows >= 0) & (cols >= 0) & (cols < n_years) & ~np.isnan(raw)
+
+    values = np.zeros((len(store.entities), n_years), dtype=np.float64)
+    present = np.zeros(values.shape, dtype=bool)
+    values[rows[keep], cols[keep]] = raw[keep]
+    present[rows[keep], cols[keep]] = True
+    values.setflags(write=False)
+    present.setflags(write=False)
+    return values, present
+
+
+def _read_metric_arrays(prefix):
+    try:
+        return tuple(
+            np.load(f"{prefix}{suffix}.npy", mmap_mode='r', allow_pickle=False)
+            for suffix in ('', '-present')
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def _write_metric_arrays(prefix, arrays):
+    Path(prefix).parent.mkdir(parents=True, exist_ok=True)
+    for suffix, array in zip(('', '-present'), arrays):
+        buffer = io.BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        _atomic_write(Path(f"{prefix}{suffix}.npy"), [buffer.getvalue()])
+
+
+def load_metric(store, dataset, path, cache_dir):
+    """
+    Indicador alinhado ao store, do cache compartilhado (`cache_dir/<nome>-<hash>.npy`,
+    via memory-map) ou lido do CSV e gravado no cache para os outros workers
+    """
+    prefix = Path(cache_dir) / f"{dataset.name}-{_file_sha256(path)[:16]}"
+    arrays = _read_metric_arrays(prefix)
+    if arrays is None:
+        columns = pd.read_csv(path, nrows=0).columns
+        column = value_column(columns, dataset)
+        arrays = align_metric(store, pd.read_csv(path, usecols=['Entity', 'Year', column]), column)
+        try:
+            _write_metric_arrays(prefix, arrays)
+            for old in Path(cache_dir).glob(f"{dataset.name}-*.npy"):
+                if not old.name.startswith(prefix.name):
+                    old.unlink(missing_ok=True)
+        except OSError:
+            pass  # Sem permissão de escrita: segue com os arrays em memória
+    return Metric(dataset.label, *arrays)
+
+
+def attach_metrics(store, datasets, data_dir, csv_path=CSV_PATH):
+    """
+    Store com `metrics` ({nome: Metric}) dos datasets extras já baixados; o original não é
+    alterado (sessões em andamento seguem com ele). Indicador com CSV ausente ou inválido é omitido.
+    """
+    datasets = [d for d in datasets if d.name != PRIMARY_DATASET]
+    signature = metrics_signature(datasets, data_dir)
+    if getattr(store, 'metrics_version', None) == signature:
+        return store
+
+    cache_dir = Path(csv_path).with_suffix('.store') / (store.version or 'local')[:16] / 'metrics'
+    metrics = {}
+    for dataset in datasets:
+        path = Path(data_dir) / dataset.filename
+        if not path.exists():
+            continue
+        try:
+            metrics[dataset.name] = load_metric(store, dataset, path, cache_dir)
+        except (OSError, ValueError, KeyError):
+            continue
+
+    # Cópia rasa: os arrays (inclusive os mmaps) são compartilhados, não copiados
+    store = copy.copy(store)
+    store.metrics = metrics
+    store.metrics_version = signature
+    return store
@@ -0,0 +1,167 @@
+"""
+Snapshot estático do dashboard no estado inicial (filtros padrão da barra lateral): um único
+HTML autocontido, com o plotly.js embutido, figuras e tabelas, para servir num servidor de
+arquivos comum. Só é regenerado quando a versão dos dados muda.
+"""
+import html
+from datetime import datetime
+from pathlib import Path
+
+from .analytics import (
+    DEFAULT_COUNTRIES, DEFAULT_ROLLING_WINDOW, DEFAULT_YEAR_START, compare_entities, get_summary_stats,
+    growth_table, rolling_windows
+)
+from .data import DATA_DIR, _atomic_write
+from .forecast import DEFAULT_HORIZON, MODELS, growth_metrics, projection_frame
+
+SNAPSHOT_DIR = DATA_DIR / "snapshot"
+
+# Linhas máximas de cada tabela no HTML (o restante fica para o app interativo)
+SNAPSHOT_MAX_ROWS = 100
+
+PAGE_STYLE = """
+body { background: #0f172a; color: #cbd5e1; font-family: system-ui, sans-serif; margin: 0; }
+main { max-width: 1200px; margin: 0 auto; padding: 1.5rem; }
+header, section > h2 { background: #1e293b; border: 1px solid #334155; border-radius: 8px; padding: 1rem 1.5rem; }
+header { text-align: center; border-radius: 12px; }
+h1, h2, h3 { color: #f8fafc; }
+nav { display: flex; gap: 1rem; justify-content: center; margin: 1rem 0 2rem; }
+nav a { color: #60a5fa; text-decoration: none; }
+section { margin-bottom: 3rem; }
+.metrics { display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem; }
+.metric { background: #1e293b; border: 1px solid #334155; border-radius: 8px; padding: 1rem; }
+.metric b { display: block; font-size: 1.6rem; color: #f8fafc; }
+table { border-collapse: collapse; width: 100%; font-size: 0.9rem; }
+th, td { border-bottom: 1px solid #334155; padding: 0.35rem 0.6rem; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.muted { color: #94a3b8; font-size: 0.85rem; }
+"""
+
+
+def _table(frame, formats, index=False):
+    """Tabela HTML formatada (no máximo SNAPSHOT_MAX_ROWS linhas)"""
+    note = ""
+    if len(frame) > SNAPSHOT_MAX_ROWS:
+        note = f"<p class='muted'>Primeiras {SNAPSHOT_MAX_ROWS} de {len(frame):,} linhas.</p>"
+        frame = frame.iloc[:SNAPSHOT_MAX_ROWS]
+    styler = frame.style.format(formats, na_rep='-')
+    if not index:
+        styler = styler.hide(axis='index')
+    return styler.to_html() + note
+
+
+def _figure(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={'displaylogo': False})
+
+
+def snapshot_sections(data):
+    """(âncora, título, HTML) de cada aba do dashboard com os filtros padrão"""
+    from .figures import (
+        build_comparison_line_figure, build_global_trend_figure, build_market_share_figure,
+        build_periods_figure, build_projection_figure, build_rolling_figure, build_top10_figure
+    )
+
+    stats = get_summary_stats(data)
+    world = growth_table(data, 'World')
+    countries = [c for c in DEFAULT_COUNTRIES if c in data.entity_index]
+    year_range = (max(DEFAULT_YEAR_START, data.year_min), data.year_max)
+
+    cards = [
+        ("Total de Vendas Globais", f"{stats['total_sales']:,}"),
+        (f"Vendas em {data.year_max}", f"{int(world['Electric cars sold'].iloc[-1]):,}" if len(world) else "-"),
+        ("Países", f"{stats['countries']}"),
+        ("Crescimento Médio Anual", f"{stats['avg_annual_growth']:.1f}%"),
+    ]
+    overview = "<div class='metrics'>" + "".join(
+        f"<div class='metric'>{html.escape(label)}<b>{value}</b></div>" for label, value in cards
+    ) + "</div>" + _figure(build_top10_figure(data)[0])
+
+    yoy = world[['Year', 'Electric cars sold', 'Variação Absoluta', 'Crescimento %']].rename(columns={
+        'Year': 'Ano', 'Electric cars sold': 'Vendas Totais', 'Variação Absoluta': 'Novas vs Anterior'
+    })
+    trends = (
+        _figure(build_global_trend_figure(data)[0])
+        + "<h3>Crescimento Ano a Ano</h3>"
+        + _table(yoy, {'Vendas Totais': '{:,.0f}', 'Novas vs Anterior': '{:+,.0f}', 'Crescimento %': '{:+.1f}%'})
+        + _figure(build_periods_figure(data)[0])
+        + _figure(build_rolling_figure(
+            rolling_windows(data, ['World'], DEFAULT_ROLLING_WINDOW, 'total'), DEFAULT_ROLLING_WINDOW, 'total'
+        )[0])
+    )
+
+    if countries:
+        comparison = compare_entities(data, countries, year_range)
+        comparison_html = (
+            _figure(build_comparison_line_figure(comparison, year_range)[0])
+            + "<h3>Análise Detalhada por Ano</h3>"
+            + _table(comparison.pivot, "{:,.0f}", index=True)
+            + _figure(build_market_share_figure(comparison)[0])
+        )
+        projection = projection_frame(data, countries, DEFAULT_HORIZON, 'loglinear')
+        projections = _figure(build_projection_figure(projection, MODELS['loglinear'], DEFAULT_HORIZON)[0])
+    else:
+        comparison_html = projections = "<p class='muted'>Sem países padrão no dataset.</p>"
+    metrics = growth_metrics(data).drop(columns='Agregado')
+    projections += "<h3>Métricas de Crescimento</h3>" + _table(metrics, {
+        'Vendas (último ano)': '{:,.0f}', 'CAGR %': '{:+.1f}%', 'YoY %': '{:+.1f}%', 'Aceleração (p.p.)': '{:+.1f}',
+        'Tendência Log-Linear %': '{:+.1f}%', 'R² Log-Linear': '{:.3f}', 'Teto Logístico': '{:,.0f}',
+        'R² Logístico': '{:.3f}'
+    })
+
+    global_data = world[['Year', 'Electric cars sold', 'Crescimento %']].rename(columns={
+        'Year': 'Ano', 'Electric cars sold': 'Vendas Globais', 'Crescimento %': 'Crescimento Anual %'
+    })
+    data_html = _table(global_data, {'Vendas Globais': '{:,.0f}', 'Crescimento Anual %': '{:+.1f}%'})
+
+    label = ", ".join(countries)
+    return [
+        ('visao-geral', "Visão Geral", overview),
+        ('tendencias', "Tendências", trends),
+        ('comparacao', f"Comparação: {label} ({year_range[0]}-{year_range[1]})", comparison_html),
+        ('projecoes', f"Projeções: {label}", projections),
+        ('dados', "Dados Globais", data_html),
+    ]
+
+
+def render_snapshot_html(data):
+    from plotly.offline import get_plotlyjs
+
+    sections = snapshot_sections(data)
+    nav = "".join(f"<a href='#{anchor}'>{html.escape(title.split(':')[0])}</a>" for anchor, title, _ in sections)
+    body = "".join(
+        f"<section id='{anchor}'><h2>{html.escape(title)}</h2>{content}</section>"
+        for anchor, title, content in sections
+    )
+    generated = datetime.now().isoformat(timespec='seconds')
+    return (
+        "<!DOCTYPE html><html lang='pt-BR'><head><meta charset='utf-8'>"
+        "<meta name='viewport' content='width=device-width, initial-scale=1'>"
+        "<title>Dashboard Vendas VE</title>"
+        f"<style>{PAGE_STYLE}</style><script>{get_plotlyjs()}</script></head><body><main>"
+        "<header><h1>Dashboard de Vendas de Veículos Elétricos</h1>"
+        f"<p class='muted'>Snapshot estático • dados {html.escape((data.version or 'local')[:16])} • "
+        f"gerado em {generated.replace('T', ' ')}</p></header>"
+        f"<nav>{nav}</nav>{body}</main></body></html>"
+    )
+
+
+def render_snapshot(data, output_dir=SNAPSHOT_DIR, force=False):
+    """
+    Grava `output_dir/index.html` e retorna (caminho, gerado). Se o carimbo `output_dir/version`
+    já é a versão atual dos dados, nada é refeito (a menos que `force` seja True).
+    """
+    output_dir = Path(output_dir)
+    path = output_dir / "index.html"
+    stamp = output_dir / "version"
+    version = data.version or 'local'
+    try:
+        current = stamp.read_text().strip()
+    except OSError:
+        current = None
+    if current == version and path.exists() and not force:
+        return path, False
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _atomic_write(path, [render_snapshot_html(data).encode('utf-8')])
+    _atomic_write(stamp, [version.encode()])
+    return path, True
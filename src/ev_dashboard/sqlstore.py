@@ -0,0 +1,355 @@
+"""
+Backend SQL embutido (SQLite ou DuckDB) com a mesma interface do EntityYearStore.
+Filtros de países/anos, rankings e agrupamentos viram consultas SQL e só o resultado
+volta para o Python: o worker não precisa manter o dataset inteiro em memória.
+Ative com EV_DASHBOARD_BACKEND=sqlite (ou duckdb); o padrão continua em memória.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .data import CSV_PATH, _atomic_write, _download_lock, _file_sha256
+from .store import build_summary, entity_metadata, read_data_version
+
+try:
+    import duckdb
+except ImportError:  # Sem duckdb: apenas o backend SQLite
+    duckdb = None
+
+SALES = 'Electric cars sold'
+INGEST_CHUNK_ROWS = 200_000
+IN_CHUNK = 500  # nomes por cláusula IN (limite de parâmetros do SQLite)
+
+# Colunas do explorador -> colunas da tabela
+SORT_COLUMNS = {'Entity': 'Entity', 'Code': 'Code', 'Year': 'Year', SALES: 'sales'}
+
+SCHEMA = [
+    "CREATE TABLE sales (row_id BIGINT, Entity VARCHAR, Code VARCHAR, Year INTEGER, sales BIGINT)",
+    "CREATE TABLE meta (key VARCHAR PRIMARY KEY, value VARCHAR)",
+]
+INDEXES = [
+    "CREATE INDEX sales_entity_year ON sales (Entity, Year)",
+    "CREATE INDEX sales_year ON sales (Year)",
+    # Metadados das entidades: agregado quando o Code é vazio ou do OWID (ex.: OWID_WRL)
+    "CREATE TABLE entities AS SELECT Entity, MIN(Code) AS Code, "
+    "MAX(CASE WHEN Code IS NULL OR Code = '' OR Code LIKE 'OWID\\_%' ESCAPE '\\' THEN 1 ELSE 0 END) "
+    "AS is_aggregate FROM sales GROUP BY Entity",
+]
+
+
+def _connect(engine, db_path, read_only=True):
+    if engine == 'duckdb':
+        if duckdb is None:
+            raise RuntimeError("Instale o duckdb para usar EV_DASHBOARD_BACKEND=duckdb")
+        return duckdb.connect(str(db_path), read_only=read_only)
+    if read_only:
+        return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    return sqlite3.connect(str(db_path))
+
+
+def _ingest(conn, engine, csv_path, source_hash):
+    """Copia o CSV para a tabela `sales` em blocos, sem carregar o arquivo inteiro"""
+    for statement in SCHEMA:
+        conn.execute(statement)
+    offset = 0
+    for chunk in pd.read_csv(csv_path, chunksize=INGEST_CHUNK_ROWS):
+        chunk = chunk.dropna(subset=[SALES])
+        rows = pd.DataFrame({
+            'row_id': np.arange(offset, offset + len(chunk), dtype=np.int64),
+            'Entity': chunk['Entity'].astype(object),
+            'Code': chunk['Code'].astype(object).where(chunk['Code'].notna(), None),
+            'Year': chunk['Year'].astype(np.int64),
+            'sales': chunk[SALES].astype(np.int64)
+        })
+        offset += len(chunk)
+        if engine == 'duckdb':
+            conn.register('chunk', rows)
+            conn.execute("INSERT INTO sales SELECT * FROM chunk")
+            conn.unregister('chunk')
+        else:
+            conn.executemany(
+                "INSERT INTO sales VALUES (?, ?, ?, ?, ?)",
+                rows.astype(object).itertuples(index=False, name=None)
+            )
+    for statement in INDEXES:
+        conn.execute(statement)
+    conn.execute("INSERT INTO meta VALUES ('source_hash', ?)", [source_hash])
+    conn.commit()
+
+
+def _db_version(engine, db_path):
+    try:
+        conn = _connect(engine, db_path)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source_hash'").fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+    except Exception:
+        return None
+
+
+def build_database(csv_path=CSV_PATH, engine='sqlite', source_hash=None):
+    """
+    Banco `<csv>.<engine>` com o conteúdo do CSV, reconstruído só quando o hash do CSV muda.
+    A escrita é feita num arquivo temporário e publicada com os.replace.
+    """
+    csv_path = Path(csv_path)
+    source_hash = source_hash or _file_sha256(csv_path)
+    db_path = csv_path.with_suffix(f'.{engine}')
+    if _db_version(engine, db_path) == source_hash:
+        return db_path
+
+    with _download_lock(csv_path.with_suffix(f'.{engine}.lock')):
+        # Outro worker pode ter construído enquanto esperávamos o lock
+        if _db_version(engine, db_path) == source_hash:
+            return db_path
+        fd, tmp_path = tempfile.mkstemp(dir=db_path.parent, prefix=f".{db_path.name}.", suffix=".tmp")
+        os.close(fd)
+        os.unlink(tmp_path)  # o engine cria o arquivo do zero
+        try:
+            conn = _connect(engine, tmp_path, read_only=False)
+            try:
+                _ingest(conn, engine, csv_path, source_hash)
+            finally:
+                conn.close()
+            os.replace(tmp_path, db_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+    return db_path
+
+
+class SQLSelection:
+    """Seleção preguiçosa do explorador: `len` faz COUNT(*), fatias viram LIMIT/OFFSET"""
+
+    def __init__(self, where, params, order, offset=0, limit=None, total=None):
+        self.where = where
+        self.params = params
+        self.order = order
+        self.offset = offset
+        self.limit = limit
+        self._total = total
+        self._store = None
+
+    def __len__(self):
+        if self._total is None:
+            sql = f"SELECT COUNT(*) FROM sales WHERE {self.where}"
+            self._total = int(self._store._query(sql, self.params)[0][0])
+        if self.limit is None:
+            return max(self._total - self.offset, 0)
+        return max(min(self.limit, self._total - self.offset), 0)
+
+    def __getitem__(self, window):
+        start, stop, _ = window.indices(len(self))
+        sub = SQLSelection(self.where, self.params, self.order, self.offset + start,
+                           max(stop - start, 0), self._total)
+        sub._store = self._store
+        return sub
+
+
+class SQLStore:
+    """
+    Mesma interface de consulta do EntityYearStore, respondida pelo banco embutido.
+    Só os metadados das entidades (uma linha por entidade) ficam em memória.
+    """
+
+    def __init__(self, db_path, engine='sqlite', version=None):
+        self.db_path = Path(db_path)
+        self.engine = engine
+        self.version = version
+        self.delta = None
+        self.metrics = {}
+        self.metrics_version = None
+        self._local = threading.local()
+
+        meta = self._query("SELECT Entity, Code, is_aggregate FROM entities ORDER BY Entity")
+        entities = np.array([row[0] for row in meta], dtype=object)
+        entities.setflags(write=False)
+        self.entities = entities
+        self.entity_index = {name: i for i, name in enumerate(entities)}
+        self.codes = np.array([row[1] for row in meta], dtype=object)
+        self.codes.setflags(write=False)
+        self.is_aggregate, self.region_masks = entity_metadata(entities, self.codes)
+        self.aggregates = entities[self.is_aggregate].tolist()
+        self.country_rows = np.flatnonzero(~self.is_aggregate)
+        self.countries = entities[self.country_rows].tolist()
+
+        year_min, year_max, rows, max_sales = self._query(
+            "SELECT MIN(Year), MAX(Year), COUNT(*), MAX(sales) FROM sales"
+        )[0]
+        self.year_min = int(year_min)
+        self.year_max = int(year_max)
+        self.years = np.arange(self.year_min, self.year_max + 1)
+        self.years.setflags(write=False)
+
+        country_sales = self._query(
+            "SELECT COALESCE(SUM(s.sales), 0) FROM sales s JOIN entities e ON e.Entity = s.Entity "
+            "WHERE e.is_aggregate = 0"
+        )[0][0]
+        world = self.entity_values('World') if 'World' in self.entity_index else None
+        self.summary = build_summary(
+            world,
+            country_sales=int(country_sales),
+            countries=len(self.countries),
+            year_min=self.year_min,
+            year_max=self.year_max,
+            rows=int(rows),
+            entities=len(entities),
+            max_sales=int(max_sales or 0)
+        )
+
+    def _query(self, sql, params=()):
+        # Uma conexão somente leitura por thread (sessões do Streamlit rodam em threads)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.engine, self.db_path)
+        return conn.execute(sql, list(params)).fetchall()
+
+    def _select_entities(self, names, columns, extra_where="", extra_params=()):
+        """Linhas das entidades `names`, em blocos de IN (...) para respeitar o limite de parâmetros"""
+        result = []
+        for start in range(0, len(names), IN_CHUNK):
+            chunk = list(names[start:start + IN_CHUNK])
+            marks = ", ".join("?" * len(chunk))
+            result.extend(self._query(
+                f"SELECT {columns} FROM sales WHERE Entity IN ({marks}){extra_where}",
+                [*chunk, *extra_params]
+            ))
+        return result
+
+    @property
+    def df(self):
+        """Dataset completo (carregado do banco; use só para exportações)"""
+        rows = self._query("SELECT Entity, Code, Year, sales FROM sales ORDER BY row_id")
+        return self._frame(rows)
+
+    def _frame(self, rows):
+        frame = pd.DataFrame(rows, columns=['Entity', 'Code', 'Year', SALES])
+        return frame.astype({'Entity': 'category', 'Code': 'category', 'Year': np.int16, SALES: np.int64})
+
+    def block(self, rows, cols=slice(None)):
+        """Vendas e presença de (entidades `rows` × colunas de ano `cols`), consultando só esse recorte"""
+        rows = np.atleast_1d(np.asarray(rows))
+        col_idx = np.arange(len(self.years))[cols]
+        values = np.zeros((len(rows), len(col_idx)), dtype=np.int64)
+        present = np.zeros(values.shape, dtype=bool)
+        if len(rows) == 0 or len(col_idx) == 0:
+            return values, present
+
+        names = self.entities[rows]
+        position = {name: i for i, name in enumerate(names)}
+        first_year = int(self.years[col_idx[0]])
+        result = self._select_entities(
+            names, "Entity, Year, sales", " AND Year BETWEEN ? AND ?",
+            [first_year, int(self.years[col_idx[-1]])]
+        )
+        if result:
+            entity, year, sales = zip(*result)
+            r = np.array([position[name] for name in entity])
+            c = np.array(year, dtype=np.int64) - first_year
+            values[r, c] = sales
+            present[r, c] = True
+        return values, present
+
+    def window_sums(self, rows, start, end):
+        """Como EntityYearStore.window_sums, com as somas prefixadas só das linhas pedidas"""
+        rows = np.asarray(rows)
+        unique = np.unique(rows)
+        values, present = self.block(unique)
+        cumsum = np.zeros((len(unique), len(self.years) + 1), dtype=np.int64)
+        np.cumsum(values, axis=1, out=cumsum[:, 1:])
+        cumcount = np.zeros(cumsum.shape, dtype=np.int64)
+        np.cumsum(present, axis=1, out=cumcount[:, 1:])
+
+        local = np.searchsorted(unique, rows)
+        n_years = len(self.years)
+        lo = np.clip(np.asarray(start) - self.year_min, 0, n_years)
+        hi = np.maximum(np.clip(np.asarray(end) - self.year_min + 1, 0, n_years), lo)
+        return cumsum[local, hi] - cumsum[local, lo], cumcount[local, hi] - cumcount[local, lo]
+
+    def entity_values(self, entity):
+        rows = self._query("SELECT sales FROM sales WHERE Entity = ? ORDER BY Year", [entity])
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def growth_frame(self, entity, with_growth=True):
+        rows = self._query(
+            "SELECT Entity, Code, Year, sales FROM sales WHERE Entity = ? ORDER BY Year", [entity]
+        )
+        frame = pd.DataFrame(rows, columns=['Entity', 'Code', 'Year', SALES])
+        frame = frame.astype({'Year': np.int64, SALES: np.int64})
+        if with_growth:
+            frame['Variação Absoluta'] = frame[SALES].diff()
+            frame['Crescimento %'] = frame[SALES].pct_change() * 100
+        return frame
+
+    def entity_frame(self, entity):
+        return self.growth_frame(entity, with_growth=False)
+
+    def region_countries(self, region=None):
+        if region is None:
+            return self.countries
+        mask = self.region_masks.get(region)
+        if mask is None:
+            return []
+        return self.entities[mask].tolist()
+
+    def top_countries(self, year=None, top_n=10):
+        where, params = ("AND s.Year = ?", [int(year)]) if year is not None else ("", [])
+        rows = self._query(
+            "SELECT s.Entity, SUM(s.sales) AS total FROM sales s JOIN entities e ON e.Entity = s.Entity "
+            f"WHERE e.is_aggregate = 0 {where} GROUP BY s.Entity ORDER BY total DESC, s.Entity LIMIT ?",
+            [*params, int(top_n)]
+        )
+        return pd.Series(
+            [int(row[1]) for row in rows], index=pd.Index([row[0] for row in rows], name='Entity'),
+            name=SALES, dtype=np.int64
+        )
+
+    def filter_rows(self, text=None, year_range=None, sales_range=None, sort_by='Entity', ascending=True):
+        clauses, params = ["1 = 1"], []
+        if text:
+            escaped = text.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("LOWER(Entity) LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if year_range is not None:
+            clauses.append("Year BETWEEN ? AND ?")
+            params.extend(int(y) for y in year_range)
+        if sales_range is not None:
+            clauses.append("sales BETWEEN ? AND ?")
+            params.extend(int(v) for v in sales_range)
+        # row_id desempata como a ordenação estável do backend em memória
+        # Code vazio vai para o fim na ordem crescente, como no backend em memória
+        direction = "ASC" if ascending else "DESC"
+        column = SORT_COLUMNS[sort_by]
+        order = f"{column} IS NULL {direction}, {column} {direction}, row_id {direction}"
+        selection = SQLSelection(" AND ".join(clauses), params, order)
+        selection._store = self
+        return selection
+
+    def take(self, selection):
+        limit = len(selection)
+        rows = self._query(
+            f"SELECT Entity, Code, Year, sales FROM sales WHERE {selection.where} "
+            f"ORDER BY {selection.order} LIMIT ? OFFSET ?",
+            [*selection.params, limit, selection.offset]
+        )
+        return self._frame(rows)
+
+
+def load_sql_store(csv_path=CSV_PATH, engine='sqlite'):
+    """Abre (construindo se preciso) o banco da versão atual do CSV e publica a versão"""
+    csv_path = Path(csv_path)
+    source_hash = _file_sha256(csv_path)
+    db_path = build_database(csv_path, engine, source_hash)
+    if read_data_version(csv_path) != source_hash:
+        try:
+            _atomic_write(csv_path.with_suffix('.version'), [source_hash.encode()])
+        except OSError:
+            pass
+    return SQLStore(db_path, engine, version=source_hash)
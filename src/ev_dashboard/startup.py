@@ -0,0 +1,118 @@
+"""
+Perfil de inicialização de um worker novo: tempo de import de cada módulo que o app carrega
+(com o Streamlit já importado, como no servidor) e tempo até a primeira renderização de uma
+sessão. O orçamento de import fica em IMPORT_BUDGET_MS; o comando falha quando é estourado.
+
+    python -m ev_dashboard startup
+"""
+import ast
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_PATH = Path(__file__).parent.parent / "app.py"
+
+# Orçamento dos imports do app sobre o Streamlit (pandas, NumPy e pyarrow incluídos; hoje ~400-600 ms).
+# Plotly Express, requests, pyarrow.parquet e sqlite só entram quando um gráfico, download ou
+# exportação pedem, e o matplotlib não é usado
+IMPORT_BUDGET_MS = 1000
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+_MARKER = "--- imports do app ---"
+
+
+def app_imports(app_path=APP_PATH):
+    """Módulos importados no topo do script do app, na ordem do arquivo"""
+    tree = ast.parse(Path(app_path).read_text(encoding='utf-8'))
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def profile_imports(app_path=APP_PATH):
+    """
+    Roda os imports do app num interpretador novo com `-X importtime`. Retorna (total_ms,
+    diretos, pacotes): `diretos` são (módulo, ms acumulado) de cada import do app e `pacotes`
+    somam o tempo próprio por pacote raiz (onde o tempo realmente vai)
+    """
+    app_path = Path(app_path)
+    modules = app_imports(app_path)
+    code = "\n".join(
+        ["import sys", "import streamlit", f"print({_MARKER!r}, file=sys.stderr)"]
+        + [f"import {m}" for m in modules if m != 'streamlit']
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=app_path.parent, capture_output=True, text=True, check=True
+    )
+    lines = result.stderr.split(_MARKER, 1)[-1].splitlines()
+
+    direct, packages = [], {}
+    for line in lines:
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        root = name.split('.')[0]
+        packages[root] = packages.get(root, 0) + int(self_us) / 1000
+        if not indent:
+            direct.append((name, int(cumulative_us) / 1000))
+    total = sum(ms for _, ms in direct)
+    return total, direct, sorted(packages.items(), key=lambda item: -item[1])
+
+
+def time_to_first_render(app_path=APP_PATH):
+    """
+    Sobe um servidor headless e abre uma sessão. Retorna {'server_ready_s', 'first_render_s',
+    'warm_rerun_s'}; sem websockets, só o tempo até o servidor responder
+    """
+    import asyncio
+
+    from .loadtest import Session, start_server, stop_server, ws_connect
+
+    started = time.perf_counter()
+    process, url = start_server(app_path)
+    timings = {'server_ready_s': time.perf_counter() - started}
+    try:
+        if ws_connect is not None:
+            async def first_session():
+                session = Session(url)
+                await session.connect()
+                try:
+                    first = await session.rerun()
+                    return first, await session.rerun(), session.errors
+                finally:
+                    await session.close()
+
+            first, warm, errors = asyncio.run(first_session())
+            timings.update(first_render_s=first, warm_rerun_s=warm, app_errors=errors)
+    finally:
+        stop_server(process)
+    return timings
+
+
+def format_report(total, direct, packages, timings=None, budget=IMPORT_BUDGET_MS, top=10):
+    status = "dentro do" if total <= budget else "ACIMA do"
+    lines = [f"Imports do app: {total:,.0f} ms ({status} orçamento de {budget:,} ms)"]
+    lines.extend(f"  {name:<32} {ms:8.1f} ms" for name, ms in direct)
+    lines.append("Tempo próprio por pacote:")
+    lines.extend(f"  {name:<32} {ms:8.1f} ms" for name, ms in packages[:top])
+    if timings:
+        lines.append(f"Servidor pronto em {timings['server_ready_s']:.2f} s")
+        if 'first_render_s' in timings:
+            lines.append(
+                f"Primeira renderização: {timings['first_render_s']:.2f} s "
+                f"(rerun seguinte: {timings['warm_rerun_s']:.2f} s); "
+                f"até o primeiro conteúdo: {timings['server_ready_s'] + timings['first_render_s']:.2f} s"
+            )
+            if timings['app_errors']:
+                lines.append(f"  {timings['app_errors']} exceções no app")
+        else:
+            lines.append("Primeira renderização não medida (instale o websockets)")
+    return "\n".join(lines)
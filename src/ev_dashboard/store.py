@@ -0,0 +1,670 @@
+"""
+Dataset em memória: matriz Entity×Year somente leitura, cache compartilhado
+entre processos (memory-map) e atualização em segundo plano
+"""
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .data import (
+    API_URL, CACHE_MAX_AGE_DAYS, CSV_PATH,
+    _atomic_write, _file_sha256, _is_fresh, _read_only_frame, load_clean_frame
+)
+from .registry import PRIMARY_DATASET, active_datasets, attach_metrics, fetch_datasets, metrics_signature
+
+# Agregados do OWID: Code vazio (regiões) ou prefixo OWID_ (ex.: World = OWID_WRL)
+AGGREGATE_CODE_PREFIX = 'OWID_'
+
+# Composição das regiões agregadas, por código ISO 3166-1 alfa-3 dos países
+EU27_CODES = frozenset([
+    'AUT', 'BEL', 'BGR', 'HRV', 'CYP', 'CZE', 'DNK', 'EST', 'FIN', 'FRA', 'DEU', 'GRC', 'HUN', 'IRL',
+    'ITA', 'LVA', 'LTU', 'LUX', 'MLT', 'NLD', 'POL', 'PRT', 'ROU', 'SVK', 'SVN', 'ESP', 'SWE'
+])
+REGION_MEMBERS = {
+    'European Union (27)': EU27_CODES,
+    'Europe': EU27_CODES | {
+        'ALB', 'AND', 'BIH', 'BLR', 'CHE', 'GBR', 'ISL', 'LIE', 'MCO', 'MDA', 'MKD', 'MNE', 'NOR',
+        'SMR', 'SRB', 'TUR', 'UKR', 'XKX'
+    },
+}
+
+# Backend de consulta: 'memory' (matriz em memória) ou 'sqlite'/'duckdb' (banco embutido)
+BACKEND = os.environ.get('EV_DASHBOARD_BACKEND', 'memory')
+
+# Linhas do changelog de atualizações mantidas em disco
+CHANGELOG_MAX_ENTRIES = 200
+
+# Diferença entre dois snapshots por (Entity, Year): células alteradas/novas/removidas
+Delta = namedtuple('Delta', ['base_version', 'changes', 'entities', 'years'])
+
+
+class EntityYearStore:
+    """
+    Matriz densa Entity×Year (somente leitura) montada uma única vez no carregamento,
+    com índice de entidades e anos para consultas por linha/coluna sem varrer o DataFrame
+    """
+
+    # Colunas do frame de crescimento (growth_frame), uma linha por (entidade, ano com registro)
+    GROWTH_ARRAYS = (
+        'growth_rows', 'growth_years', 'growth_sales', 'growth_change', 'growth_pct', 'growth_offsets'
+    )
+    # Arrays derivados persistidos no cache compartilhado entre processos
+    SHARED_ARRAYS = ('matrix', 'present', 'year_rank', 'cumsum', 'cumcount') + GROWTH_ARRAYS
+
+    def __init__(self, df, arrays=None, version=None):
+        self._df = df
+        self.version = version
+        self.delta = None  # Delta em relação à versão anterior, quando aplicada incrementalmente
+        # Indicadores extras do registro de datasets ({nome: Metric}), ver registry.attach_metrics
+        self.metrics = {}
+        self.metrics_version = None
+
+        entities = np.array(sorted(df['Entity'].unique().tolist()), dtype=object)
+        entities.setflags(write=False)
+        self.entities = entities
+        self.entity_index = {name: i for i, name in enumerate(entities)}
+
+        self.year_min = int(df['Year'].min())
+        self.year_max = int(df['Year'].max())
+        self.years = np.arange(self.year_min, self.year_max + 1)
+        self.years.setflags(write=False)
+
+        if arrays is not None:
+            # Views somente leitura de arquivos mapeados em memória (páginas compartilhadas)
+            matrix, present = arrays['matrix'], arrays['present']
+        else:
+            rows = pd.Categorical(df['Entity'], categories=entities).codes
+            cols = df['Year'].to_numpy(dtype=np.int64) - self.year_min
+
+            # Vendas (int64) e máscara de presença: ano sem registro != ano com zero vendas
+            matrix = np.zeros((len(entities), len(self.years)), dtype=np.int64)
+            np.add.at(matrix, (rows, cols), df['Electric cars sold'].to_numpy(dtype=np.int64))
+            present = np.zeros(matrix.shape, dtype=bool)
+            present[rows, cols] = True
+            matrix.setflags(write=False)
+            present.setflags(write=False)
+        self.matrix = matrix
+        self.present = present
+
+        # Somas prefixadas por entidade (coluna 0 = antes do primeiro ano): o total e o número
+        # de anos com registro de qualquer janela são duas leituras, sem varrer a série
+        if arrays is not None:
+            cumsum, cumcount = arrays['cumsum'], arrays['cumcount']
+        else:
+            cumsum = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.int64)
+            np.cumsum(matrix, axis=1, out=cumsum[:, 1:])
+            cumcount = np.zeros(cumsum.shape, dtype=np.int32)
+            np.cumsum(present, axis=1, out=cumcount[:, 1:])
+            cumsum.setflags(write=False)
+            cumcount.setflags(write=False)
+        self.cumsum = cumsum
+        self.cumcount = cumcount
+
+        codes = df.drop_duplicates('Entity').set_index('Entity')['Code']
+        self.codes = codes.reindex(entities).to_numpy(dtype=object, copy=True)
+        self.codes.setflags(write=False)
+
+        # Metadados por entidade: agregado x país (pelo Code) e máscaras de cada região
+        self.is_aggregate, self.region_masks = entity_metadata(entities, self.codes)
+        self.aggregates = entities[self.is_aggregate].tolist()
+
+        # Linhas dos países (exclui agregados), já em ordem alfabética
+        self.country_rows = np.flatnonzero(~self.is_aggregate)
+        self.countries = entities[self.country_rows].tolist()
+
+        # Ranking de países: histórico total e por ano (colunas), pré-ordenados
+        country_matrix = matrix[self.country_rows]
+        totals = country_matrix.sum(axis=1)
+        order = np.argsort(-totals, kind='stable')
+        ranked = totals[order]
+        ranked.setflags(write=False)
+        self.country_totals = pd.Series(
+            ranked, index=pd.Index(entities[self.country_rows][order], name='Entity'),
+            name='Electric cars sold', copy=False
+        )
+        if arrays is not None:
+            self.year_rank = arrays['year_rank']
+        else:
+            self.year_rank = np.argsort(-country_matrix, axis=0, kind='stable')
+            self.year_rank.setflags(write=False)
+
+        self.summary = self._build_summary()
+        self._growth = self._build_growth(arrays)
+
+        # Ordenações do DataFrame por coluna, calculadas sob demanda (explorador de dados)
+        self._sort_orders = {}
+
+    def _build_summary(self):
+        world = self.entity_values('World') if 'World' in self.entity_index else None
+        return build_summary(
+            world,
+            country_sales=int(self.matrix[self.country_rows].sum()),
+            countries=len(self.countries),
+            year_min=self.year_min,
+            year_max=self.year_max,
+            rows=len(self._df),
+            entities=len(self.entities),
+            max_sales=int(self.matrix.max()) if self.matrix.size else 0
+        )
+
+    @property
+    def df(self):
+        """
+        DataFrame limpo compartilhado. Os valores são somente leitura e cada acesso devolve
+        um novo objeto raso (sem cópia de dados), então nenhuma sessão altera o das outras.
+        """
+        return self._df.copy(deep=False)
+
+    def _build_growth(self, arrays=None):
+        """
+        Séries de todas as entidades (anos com registro, em ordem) com variação absoluta e
+        crescimento % em relação ao registro anterior, numa passada sobre a matriz.
+        As colunas (GROWTH_ARRAYS) vêm do cache compartilhado quando presentes em `arrays`;
+        `growth_offsets` é o deslocamento de cada entidade no frame somente leitura devolvido.
+        """
+        if arrays is not None and all(name in arrays for name in self.GROWTH_ARRAYS):
+            for name in self.GROWTH_ARRAYS:
+                setattr(self, name, arrays[name])
+        else:
+            rows, cols = np.nonzero(self.present)
+            sales = self.matrix[rows, cols]
+            first = np.ones(len(rows), dtype=bool)
+            first[1:] = rows[1:] != rows[:-1]
+
+            previous = np.empty(len(sales), dtype=np.float64)
+            previous[1:] = sales[:-1]
+            previous[first] = np.nan
+            change = sales - previous
+            with np.errstate(divide='ignore', invalid='ignore'):
+                growth = change / previous * 100
+
+            offsets = np.zeros(len(self.entities) + 1, dtype=np.int64)
+            np.cumsum(self.present.sum(axis=1), out=offsets[1:])
+            self.growth_rows, self.growth_years, self.growth_sales = rows, self.years[cols], sales
+            self.growth_change, self.growth_pct, self.growth_offsets = change, growth, offsets
+            for name in self.GROWTH_ARRAYS:
+                getattr(self, name).setflags(write=False)
+
+        codes = pd.Categorical(self.codes)
+        return _read_only_frame({
+            'Entity': pd.Categorical.from_codes(self.growth_rows, categories=self.entities),
+            'Code': pd.Categorical.from_codes(codes.codes[self.growth_rows], dtype=codes.dtype),
+            'Year': self.growth_years,
+            'Electric cars sold': self.growth_sales,
+            'Variação Absoluta': self.growth_change,
+            'Crescimento %': self.growth_pct
+        })
+
+    def growth_frame(self, entity, with_growth=True):
+        """Fatia (view, sem cópia) da série de uma entidade no frame pré-calculado"""
+        row = self.entity_index.get(entity)
+        start, end = (self.growth_offsets[row], self.growth_offsets[row + 1]) if row is not None else (0, 0)
+        frame = self._growth if with_growth else self._growth[['Entity', 'Code', 'Year', 'Electric cars sold']]
+        return frame.iloc[start:end].reset_index(drop=True)
+
+    def block(self, rows, cols=slice(None)):
+        """Vendas e máscara de presença do bloco (entidades `rows` × colunas de ano `cols`)"""
+        return self.matrix[rows][:, cols], self.present[rows][:, cols]
+
+    def filter_rows(self, text=None, year_range=None, sales_range=None, sort_by='Entity', ascending=True):
+        """
+        Posições (em `df`) das linhas que passam nos filtros, já na ordem pedida.
+        O texto é comparado com a lista de entidades, não linha a linha.
+        """
+        df = self._df
+        mask = np.ones(len(df), dtype=bool)
+        if text:
+            entities = df['Entity'].cat.categories
+            hits = np.flatnonzero(entities.str.contains(text, case=False, regex=False))
+            mask &= np.isin(df['Entity'].cat.codes.to_numpy(), hits)
+        if year_range is not None:
+            years = df['Year'].to_numpy()
+            mask &= (years >= year_range[0]) & (years <= year_range[1])
+        if sales_range is not None:
+            sales = df['Electric cars sold'].to_numpy()
+            mask &= (sales >= sales_range[0]) & (sales <= sales_range[1])
+
+        order = self.sort_order(sort_by)
+        selected = order[mask[order]]
+        return selected if ascending else selected[::-1]
+
+    def take(self, selection):
+        """Linhas de uma seleção de `filter_rows` (ou fatia dela) como DataFrame"""
+        return self._df.iloc[selection].reset_index(drop=True)
+
+    def entity_values(self, entity):
+        """Vendas dos anos com registro de uma entidade (linha da matriz)"""
+        row = self.entity_index.get(entity)
+        if row is None:
+            return np.array([], dtype=np.int64)
+        return self.matrix[row][self.present[row]]
+
+    def entity_frame(self, entity):
+        """Linhas de uma entidade ordenadas por ano, no formato do DataFrame original"""
+        return self.growth_frame(entity, with_growth=False)
+
+    def sort_order(self, column):
+        """Permutação estável das linhas de `df` em ordem crescente de `column` (calculada uma vez)"""
+        order = self._sort_orders.get(column)
+        if order is None:
+            values = self._df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Posição alfabética de cada categoria; código -1 (vazio) vai para o fim
+                cats = values.cat.categories
+                rank = np.append(np.argsort(np.argsort(cats.astype(str))), len(cats))
+                keys = rank[values.cat.codes.to_numpy()]
+            else:
+                keys = values.to_numpy()
+            order = np.argsort(keys, kind='stable')
+            order.setflags(write=False)
+            self._sort_orders[column] = order
+        return order
+
+    def window_sums(self, rows, start, end):
+        """
+        Soma de vendas e anos com registro em [start, end] (inclusive) para cada linha.
+        `rows`, `start` e `end` são combinados por broadcasting do NumPy (ex.: rows[:, None]).
+        """
+        n_years = len(self.years)
+        lo = np.clip(np.asarray(start) - self.year_min, 0, n_years)
+        hi = np.maximum(np.clip(np.asarray(end) - self.year_min + 1, 0, n_years), lo)
+        return self.cumsum[rows, hi] - self.cumsum[rows, lo], self.cumcount[rows, hi] - self.cumcount[rows, lo]
+
+    def region_countries(self, region=None):
+        """Países de uma região agregada (todos os países quando `region` é None)"""
+        if region is None:
+            return self.countries
+        mask = self.region_masks.get(region)
+        if mask is None:
+            return []
+        return self.entities[mask].tolist()
+
+    def top_countries(self, year=None, top_n=10):
+        if year is None:
+            return self.country_totals.head(top_n)
+
+        col = int(year) - self.year_min
+        if col < 0 or col >= len(self.years):
+            return self.country_totals.iloc[0:0]
+        rank = self.year_rank[:, col]
+        rank = rank[self.present[self.country_rows[rank], col]][:top_n]
+        rows = self.country_rows[rank]
+        return pd.Series(
+            self.matrix[rows, col], index=pd.Index(self.entities[rows], name='Entity'),
+            name='Electric cars sold'
+        )
+
+
+def entity_metadata(entities, codes):
+    """
+    Máscara de agregados (Code vazio ou com prefixo OWID_) e máscaras de países de cada
+    região agregada presente em `entities`, todas somente leitura e alinhadas a `entities`
+    """
+    code_str = pd.Series(codes, dtype=object).fillna('').astype(str)
+    is_aggregate = ((code_str == '') | code_str.str.startswith(AGGREGATE_CODE_PREFIX)).to_numpy()
+    is_aggregate.setflags(write=False)
+    region_masks = {}
+    for region, members in REGION_MEMBERS.items():
+        if region in set(entities):
+            mask = ~is_aggregate & code_str.isin(members).to_numpy()
+            mask.setflags(write=False)
+            region_masks[region] = mask
+    return is_aggregate, region_masks
+
+
+def build_summary(world, country_sales, countries, year_min, year_max, rows, entities, max_sales):
+    """Indicadores gerais a partir da série do World (None se ausente) e das contagens"""
+    # Total do agregado World quando existe; somar todas as linhas contaria regiões e países
+    total_sales = int(world.sum()) if world is not None else country_sales
+    world = world if world is not None else np.array([])
+    # Crescimento médio anual composto (CAGR) entre o primeiro e o último ano, não a média
+    # aritmética das variações anuais (que superestima séries voláteis)
+    if len(world) > 1 and world[0] > 0:
+        avg_growth = float(((world[-1] / world[0]) ** (1 / (len(world) - 1)) - 1) * 100)
+    else:
+        avg_growth = 0
+
+    return {
+        'total_sales': total_sales,
+        'countries': countries,
+        'year_min': year_min,
+        'year_max': year_max,
+        'avg_annual_growth': avg_growth,
+        'rows': rows,
+        'entities': entities,
+        'max_sales': max_sales
+    }
+
+
+def compute_delta(old, df):
+    """
+    Compara o DataFrame limpo de um snapshot novo com o store atual, célula a célula
+    (Entity, Year), sem montar a matriz nova. None quando o delta não se aplica
+    (entidades ou anos novos ou removidos, ou (Entity, Year) duplicado): nesse caso
+    reconstrói tudo. O store novo herda a forma dos arrays atuais, então as entidades e o
+    intervalo de anos do snapshot precisam ser exatamente os mesmos.
+    """
+    entities = np.array(sorted(df['Entity'].unique().tolist()), dtype=object)
+    if not np.array_equal(entities, old.entities):
+        return None
+    if len(df) == 0 or int(df['Year'].min()) != old.year_min or int(df['Year'].max()) != old.year_max:
+        return None
+
+    rows = pd.Categorical(df['Entity'], categories=old.entities).codes.astype(np.int64)
+    cols = df['Year'].to_numpy(dtype=np.int64) - old.year_min
+    if (rows < 0).any() or (cols < 0).any() or (cols >= len(old.years)).any():
+        return None
+    flat = rows * len(old.years) + cols
+    if np.bincount(flat, minlength=old.matrix.size).max(initial=0) > 1:
+        return None
+
+    sales = df['Electric cars sold'].to_numpy(dtype=np.int64)
+    before = old.matrix.ravel()[flat]
+    was_present = old.present.ravel()[flat]
+    moved = ~was_present | (before != sales)
+
+    covered = np.zeros(old.matrix.size, dtype=bool)
+    covered[flat] = True
+    removed = np.flatnonzero(old.present.ravel() & ~covered)
+
+    cells = np.concatenate([flat[moved], removed])
+    changes = pd.DataFrame({
+        'Entity': old.entities[cells // len(old.years)],
+        'Year': old.years[cells % len(old.years)],
+        'before': np.concatenate([np.where(was_present[moved], before[moved], 0), old.matrix.ravel()[removed]]),
+        'after': np.concatenate([sales[moved], np.zeros(len(removed), dtype=np.int64)]),
+        'kind': np.concatenate([
+            np.where(was_present[moved], 'changed', 'added'), np.full(len(removed), 'removed')
+        ])
+    })
+    return Delta(
+        base_version=old.version,
+        changes=changes,
+        entities=sorted(set(changes['Entity'])),
+        years=sorted(int(y) for y in set(changes['Year']))
+    )
+
+
+def apply_delta(old, df, delta, version=None):
+    """
+    Novo store a partir do atual e de um delta: copia os arrays, grava só as células
+    alteradas e recalcula somas prefixadas e rankings apenas das entidades/anos afetados.
+    """
+    matrix = np.array(old.matrix)
+    present = np.array(old.present)
+    cumsum = np.array(old.cumsum)
+    cumcount = np.array(old.cumcount)
+    year_rank = np.array(old.year_rank)
+
+    changes = delta.changes
+    rows = np.array([old.entity_index[e] for e in changes['Entity']], dtype=np.int64)
+    cols = changes['Year'].to_numpy(dtype=np.int64) - old.year_min
+    matrix[rows, cols] = changes['after'].to_numpy(dtype=np.int64)
+    present[rows, cols] = (changes['kind'] != 'removed').to_numpy()
+
+    affected = np.unique(rows)
+    cumsum[affected, 1:] = np.cumsum(matrix[affected], axis=1)
+    cumcount[affected, 1:] = np.cumsum(present[affected], axis=1)
+
+    # Ranking por ano só muda nas colunas que tiveram alguma célula de país alterada
+    country_cols = np.unique(cols[~old.is_aggregate[rows]])
+    if len(country_cols):
+        year_rank[:, country_cols] = np.argsort(
+            -matrix[old.country_rows][:, country_cols], axis=0, kind='stable'
+        )
+
+    arrays = {'matrix': matrix, 'present': present, 'year_rank': year_rank,
+              'cumsum': cumsum, 'cumcount': cumcount}
+    for array in arrays.values():
+        array.setflags(write=False)
+    store = EntityYearStore(df, arrays, version=version)
+    store.delta = delta
+    return store
+
+
+def _append_changelog(changelog_path, delta, version):
+    """Registra um resumo do delta (contagens e maiores variações) no changelog JSONL"""
+    changes = delta.changes
+    largest = changes.assign(move=(changes['after'] - changes['before']).abs()).nlargest(10, 'move')
+    entry = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'from': delta.base_version,
+        'to': version,
+        'counts': changes['kind'].value_counts().to_dict(),
+        'entities': delta.entities[:50],
+        'years': delta.years,
+        'largest': [
+            {'Entity': r.Entity, 'Year': int(r.Year), 'before': int(r.before), 'after': int(r.after)}
+            for r in largest.itertuples()
+        ]
+    }
+    try:
+        lines = changelog_path.read_text().splitlines()[-(CHANGELOG_MAX_ENTRIES - 1):]
+    except OSError:
+        lines = []
+    lines.append(json.dumps(entry, ensure_ascii=False))
+    _atomic_write(changelog_path, [("\n".join(lines) + "\n").encode('utf-8')])
+
+
+def read_changelog(csv_path=CSV_PATH, limit=20):
+    """Entradas mais recentes do changelog de atualizações (mais nova primeiro)"""
+    try:
+        lines = Path(csv_path).with_suffix('.changelog.jsonl').read_text().splitlines()
+    except OSError:
+        return []
+    return [json.loads(line) for line in reversed(lines[-limit:]) if line.strip()]
+
+
+def _read_store_arrays(store_dir):
+    try:
+        return {
+            name: np.load(store_dir / f"{name}.npy", mmap_mode='r', allow_pickle=False)
+            for name in EntityYearStore.SHARED_ARRAYS
+        }
+    except (OSError, ValueError):
+        return None
+
+
+def _write_store_arrays(store_dir, store):
+    store_dir.mkdir(parents=True, exist_ok=True)
+    for name in EntityYearStore.SHARED_ARRAYS:
+        buffer = io.BytesIO()
+        np.save(buffer, getattr(store, name), allow_pickle=False)
+        _atomic_write(store_dir / f"{name}.npy", [buffer.getvalue()])
+
+
+def read_data_version(csv_path=CSV_PATH):
+    """Versão publicada do dataset (hash do CSV) compartilhada entre os workers do host"""
+    try:
+        return Path(csv_path).with_suffix('.version').read_text().strip()
+    except OSError:
+        return None
+
+
+def load_shared_store(csv_path=CSV_PATH, previous=None):
+    """
+    Dataset e agregados derivados a partir do cache compartilhado entre processos.
+
+    O DataFrame limpo (Arrow) e os arrays da matriz Entity×Year (.npy) ficam em disco,
+    versionados pelo hash do CSV, e são abertos via memory-map: todos os workers do host
+    leem as mesmas páginas do cache do SO em vez de manter cópias privadas. O primeiro
+    worker a ver uma versão nova grava os arquivos e publica o carimbo de versão.
+
+    Com `previous` (o store em uso), o snapshot novo é comparado por (Entity, Year) e só as
+    células alteradas são aplicadas; o delta fica em `store.delta` e vai para o changelog.
+    """
+    csv_path = Path(csv_path)
+    source_hash = _file_sha256(csv_path)
+    store_dir = csv_path.with_suffix('.store') / source_hash[:16]
+    if previous is not None and previous.version == source_hash:
+        return previous
+
+    df = load_clean_frame(csv_path, source_hash)
+    arrays = _read_store_arrays(store_dir)
+    delta = compute_delta(previous, df) if previous is not None else None
+    if arrays is None and delta is not None:
+        store = apply_delta(previous, df, delta, version=source_hash)
+    else:
+        store = EntityYearStore(df, arrays, version=source_hash)
+        store.delta = delta
+
+    if arrays is None:
+        try:
+            _write_store_arrays(store_dir, store)
+        except OSError:
+            pass  # Sem permissão de escrita: este worker segue com a cópia em memória
+
+    if read_data_version(csv_path) != source_hash:
+        try:
+            _atomic_write(csv_path.with_suffix('.version'), [source_hash.encode()])
+            if delta is not None:
+                _append_changelog(csv_path.with_suffix('.changelog.jsonl'), delta, source_hash)
+            # Versões antigas não são mais publicadas (mmaps abertos seguem válidos no POSIX)
+            for old_dir in store_dir.parent.iterdir():
+                if old_dir != store_dir:
+                    shutil.rmtree(old_dir, ignore_errors=True)
+        except OSError:
+            pass
+    return store
+
+
+def load_store(csv_path=CSV_PATH, previous=None, backend=None):
+    """Dataset no backend configurado (EV_DASHBOARD_BACKEND), com a mesma interface de consulta"""
+    backend = backend or BACKEND
+    if backend == 'memory':
+        return load_shared_store(csv_path, previous=previous)
+    if backend not in ('sqlite', 'duckdb'):
+        raise ValueError(f"Backend desconhecido: {backend}")
+    from .sqlstore import load_sql_store
+    if previous is not None and previous.version == _file_sha256(csv_path):
+        return previous
+    return load_sql_store(csv_path, engine=backend)
+
+
+class DataRefresher:
+    """
+    Stale-while-revalidate: serve o dataset atual enquanto uma thread em segundo plano
+    revalida o CSV na API e, após baixar e validar, troca o dataset atomicamente.
+    Nenhuma requisição de usuário espera pela chamada HTTP (exceto a primeira
+    execução sem nenhum CSV local, quando não há o que servir).
+
+    Entre as verificações na API, acompanha o carimbo de versão compartilhado a cada
+    `version_poll_interval` segundos: quando outro worker baixa dados novos, este apenas
+    remapeia o cache compartilhado, sem baixar de novo.
+
+    Os datasets do registro (`datasets`, padrão: registry.load_registry()) são buscados em
+    paralelo; falha num indicador opcional fica em `dataset_errors` e não bloqueia os demais.
+    """
+
+    def __init__(self, csv_path=CSV_PATH, api_url=API_URL, max_age_days=CACHE_MAX_AGE_DAYS,
+                 check_interval=3600, version_poll_interval=30, backend=None, datasets=None):
+        self.csv_path = Path(csv_path)
+        self.backend = backend
+        self.api_url = api_url
+        self.max_age_days = max_age_days
+        self.check_interval = check_interval
+        self.version_poll_interval = version_poll_interval
+        # O dataset principal segue o CSV, a URL e a política passados aqui
+        self.datasets = [
+            d._replace(filename=self.csv_path.name, source=api_url, max_age_days=max_age_days)
+            if d.name == PRIMARY_DATASET else d
+            for d in active_datasets(datasets)
+        ]
+        self.dataset_errors = {}
+
+        self.status = 'idle'  # 'idle' | 'refreshing' | 'ok' | 'error'
+        self.last_error = None
+        self.last_check = None
+        self._force = threading.Event()
+        self._wake = threading.Event()
+
+        self._data = None
+        if self.csv_path.exists():
+            self._data = self._load()
+        else:
+            self._refresh_once(force=True)
+
+        self._thread = threading.Thread(target=self._run, name='ev-data-refresher', daemon=True)
+        self._thread.start()
+
+    def current(self):
+        """Dataset em uso (a troca é a atribuição de uma única referência)"""
+        return self._data
+
+    def request_refresh(self):
+        """Agenda revalidação imediata em segundo plano e retorna sem esperar"""
+        self._force.set()
+        self._wake.set()
+
+    def is_stale(self):
+        """CSV local mais velho que `max_age_days` (ou ausente)"""
+        return not _is_fresh(self.csv_path, self.max_age_days)
+
+    def is_refreshing(self):
+        return self.status == 'refreshing' or self._force.is_set()
+
+    def data_age(self):
+        """Tempo desde a última verificação/baixa do CSV local"""
+        if not self.csv_path.exists():
+            return None
+        return datetime.now() - datetime.fromtimestamp(self.csv_path.stat().st_mtime)
+
+    def _run(self):
+        next_check = time.monotonic() + self.check_interval
+        while True:
+            self._wake.wait(min(self.check_interval, self.version_poll_interval))
+            self._wake.clear()
+            force = self._force.is_set()
+            self._force.clear()
+            if force or time.monotonic() >= next_check:
+                self._refresh_once(force)
+                next_check = time.monotonic() + self.check_interval
+            else:
+                self._sync_version()
+
+    def _load(self, previous=None):
+        """Dataset principal no backend configurado, com os indicadores extras alinhados"""
+        store = load_store(self.csv_path, previous=previous, backend=self.backend)
+        return attach_metrics(store, self.datasets, self.csv_path.parent, self.csv_path)
+
+    def _metrics_changed(self):
+        return metrics_signature(self.datasets, self.csv_path.parent) != self._data.metrics_version
+
+    def _sync_version(self):
+        """Remapeia o cache compartilhado se outro worker publicou uma versão nova"""
+        version = read_data_version(self.csv_path)
+        if version is None or self._data is None:
+            return
+        if version == self._data.version and not self._metrics_changed():
+            return
+        try:
+            self._data = self._load(previous=self._data)
+        except Exception as e:
+            self.status = 'error'
+            self.last_error = str(e)
+
+    def _refresh_once(self, force=False):
+        self.status = 'refreshing'
+        try:
+            results = fetch_datasets(self.datasets, self.csv_path.parent, force=force)
+            self.dataset_errors = {
+                name: str(result) for name, result in results.items() if isinstance(result, Exception)
+            }
+            if (results.get(PRIMARY_DATASET) or self._data is None
+                    or read_data_version(self.csv_path) != self._data.version or self._metrics_changed()):
+                self._data = self._load(previous=self._data)
+            self.status = 'ok'
+            self.last_error = None
+        except Exception as e:  # Mantém a thread viva e o dataset anterior em uso
+            self.status = 'error'
+            self.last_error = str(e)
+        self.last_check = datetime.now()
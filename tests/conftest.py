@@ -0,0 +1,93 @@
+import hashlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# O pacote fica em src/ (o app roda com `cd src`)
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+ENTITIES = {'Australia': 'AUS', 'Brazil': 'BRA', 'China': 'CHN', 'World': 'OWID_WRL'}
+YEARS = range(2018, 2024)
+
+
+def sales_frame(entities=ENTITIES, years=YEARS):
+    """Vendas sintéticas no formato do CSV da API (crescimento exponencial por entidade)"""
+    rows = [
+        {'Entity': name, 'Code': code, 'Year': year, 'Electric cars sold': (i + 1) * 1000 * 2 ** (year - 2018)}
+        for i, (name, code) in enumerate(entities.items())
+        for year in years
+    ]
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    def write(df, name="ev_sales_global.csv"):
+        path = tmp_path / name
+        df.to_csv(path, index=False)
+        return path
+    return write
+
+
+class StandInServer:
+    """
+    Servidor HTTP local no lugar das fontes remotas: serve `files` ({nome: bytes}) com ETag
+    (If-None-Match responde 304), espera `delay` segundos por resposta e registra cada
+    requisição em `requests` como (nome, status, início, fim)
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.delay = 0.0
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                started = time.monotonic()
+                time.sleep(stand_in.delay)
+                name = self.path.lstrip('/')
+                body = stand_in.files.get(name)
+                etag = body is not None and f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                if body is None:
+                    status = 404
+                else:
+                    status = 304 if self.headers.get('If-None-Match') == etag else 200
+                # Registrada antes da resposta: o cliente pode seguir assim que a recebe
+                stand_in.requests.append((name, status, started, time.monotonic()))
+                if status == 404:
+                    self.send_error(status)
+                    return
+                self.send_response(status)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body) if status == 200 else 0))
+                self.end_headers()
+                if status == 200:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, name):
+        return f"{self.base_url}/{name}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer()
+    yield server
+    server.close()
@@ -0,0 +1,88 @@
+import json
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import sales_frame
+from ev_dashboard.data import _UMASK, _atomic_write, refresh_csv
+from ev_dashboard.loadtest import local_upstream
+
+
+@pytest.mark.parametrize('mode', [0o644, 0o640])
+def test_atomic_write_keeps_existing_mode(tmp_path, mode):
+    path = tmp_path / "dados.csv"
+    path.write_bytes(b"antigo")
+    os.chmod(path, mode)
+    _atomic_write(path, [b"novo"])
+    assert path.read_bytes() == b"novo"
+    assert stat.S_IMODE(path.stat().st_mode) == mode
+
+
+def test_atomic_write_new_file_follows_umask(tmp_path):
+    path = tmp_path / "novo.json"
+    _atomic_write(path, [b"{}"])
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~_UMASK
+
+
+def _csv_bytes(df):
+    return df.to_csv(index=False).encode()
+
+
+def test_refresh_etag_round_trip(stand_in, tmp_path):
+    stand_in.files['vendas.csv'] = body = _csv_bytes(sales_frame())
+    path = tmp_path / "ev_sales_global.csv"
+
+    assert refresh_csv(path, stand_in.url('vendas.csv'), max_age_days=0)
+    assert json.loads(path.with_suffix('.meta.json').read_text())['etag']
+    inode = path.stat().st_ino
+
+    # Upstream inalterado: If-None-Match → 304, o arquivo não é regravado
+    assert not refresh_csv(path, stand_in.url('vendas.csv'), max_age_days=0)
+    assert [status for _, status, _, _ in stand_in.requests] == [200, 304]
+    assert path.stat().st_ino == inode
+    assert path.read_bytes() == body
+
+
+def test_refresh_if_modified_since(tmp_path):
+    upstream_dir = tmp_path / "upstream"
+    upstream_dir.mkdir()
+    (upstream_dir / "ev_sales_global.csv").write_bytes(_csv_bytes(sales_frame()))
+    path = tmp_path / "ev_sales_global.csv"
+
+    with local_upstream(upstream_dir) as env:
+        url = env['EV_DASHBOARD_API_URL']
+        assert refresh_csv(path, url, max_age_days=0)
+        meta = json.loads(path.with_suffix('.meta.json').read_text())
+        assert meta['last_modified'] and not meta['etag']
+        inode = path.stat().st_ino
+        assert not refresh_csv(path, url, max_age_days=0)
+    assert path.stat().st_ino == inode
+
+
+def test_refresh_single_flight(stand_in, tmp_path):
+    stand_in.files['vendas.csv'] = _csv_bytes(sales_frame())
+    stand_in.delay = 0.3
+    path = tmp_path / "ev_sales_global.csv"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: refresh_csv(path, stand_in.url('vendas.csv'), max_age_days=1), range(5)))
+
+    # Quem esperou o lock reaproveita o arquivo recém-baixado
+    assert results.count(True) == 1
+    assert len(stand_in.requests) == 1
+
+
+def test_rejected_download_keeps_current_csv(stand_in, tmp_path):
+    stand_in.files['vendas.csv'] = body = _csv_bytes(sales_frame())
+    path = tmp_path / "ev_sales_global.csv"
+    assert refresh_csv(path, stand_in.url('vendas.csv'), max_age_days=0)
+    meta = path.with_suffix('.meta.json').read_text()
+
+    stand_in.files['vendas.csv'] = b"Entity,Year\nWorld,2023\n"
+    with pytest.raises(ValueError):
+        refresh_csv(path, stand_in.url('vendas.csv'), max_age_days=0)
+    assert path.read_bytes() == body
+    assert path.with_suffix('.meta.json').read_text() == meta
+    assert not list(tmp_path.glob('*.tmp'))
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io
+import plotly.tools
+
+from conftest import sales_frame
+from ev_dashboard.downsample import CHART_WIDTH_PX, POINTS_PER_PX
+from ev_dashboard.figures import (
+    FigureCache, build_global_trend_figure, build_projection_figure, build_rolling_figure, figure_key
+)
+from ev_dashboard.store import load_shared_store
+
+
+def test_cache_hit_skips_building_and_validation(write_csv, monkeypatch):
+    data = load_shared_store(write_csv(sales_frame()))
+    cache = FigureCache()
+    key = figure_key(data, 'global_trend')
+
+    fig, extras = cache.get_or_build(key, lambda: build_global_trend_figure(data))
+    assert isinstance(fig, go.Figure)
+
+    def fail():
+        raise AssertionError("figura remontada num acerto")
+
+    # Caminho do st.plotly_chart num acerto: nenhum go.Figure é construído (sem revalidação)
+    constructed = []
+    original_init = go.Figure.__init__
+
+    def counting_init(self, *args, **kwargs):
+        constructed.append(1)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(go.Figure, '__init__', counting_init)
+    cached, cached_extras = cache.get_or_build(key, fail)
+    spec = plotly.io.to_json(plotly.tools.return_figure_from_figure_or_data(cached, validate_figure=True),
+                             validate=False)
+    assert not constructed
+    assert cached is fig
+    assert cached_extras == extras
+    assert spec == plotly.io.to_json(fig, validate=False)
+    assert cache.stats()['hits'] == 1
+
+
+def test_long_rolling_series_are_downsampled_to_webgl():
+    periods = np.arange(20_000)
+    max_points = CHART_WIDTH_PX * POINTS_PER_PX
+
+    rolling = pd.DataFrame({'World': np.sin(periods / 50.0), 'China': np.cos(periods / 50.0)}, index=periods)
+    fig, _ = build_rolling_figure(rolling, 3, 'mean')
+    assert {trace.type for trace in fig.data} == {'scattergl'}
+    assert all(len(trace.x) <= max_points for trace in fig.data)
+
+
+def test_long_projection_is_downsampled_to_webgl():
+    periods = np.arange(20_000)
+    max_points = CHART_WIDTH_PX * POINTS_PER_PX
+    projection = pd.DataFrame({
+        'Entity': 'World', 'Year': periods, 'Electric cars sold': periods * 10.0,
+        'Tipo': np.where(periods < 15_000, 'Histórico', 'Projeção')
+    })
+    fig, _ = build_projection_figure(projection, 'Linear', 5)
+    assert {trace.type for trace in fig.data} == {'scattergl'}
+    assert all(len(trace.x) <= max_points for trace in fig.data)
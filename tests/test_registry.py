@@ -0,0 +1,53 @@
+import pandas as pd
+
+from conftest import ENTITIES, YEARS, sales_frame
+from ev_dashboard.registry import DATASETS, attach_metrics, fetch_datasets
+from ev_dashboard.store import load_shared_store
+
+
+def _stock_frame():
+    """Frota só de parte da grade: China sem 2019, Brazil ausente e uma entidade fora das vendas"""
+    rows = [
+        {'Entity': name, 'Code': ENTITIES.get(name, ''), 'Year': year, 'Electric car stocks': 10 * year}
+        for name in ('China', 'World', 'Atlantis')
+        for year in YEARS
+        if (name, year) != ('China', 2019)
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_concurrent_fetch_and_alignment(stand_in, tmp_path):
+    stand_in.files['vendas.csv'] = sales_frame().to_csv(index=False).encode()
+    stand_in.files['frota.csv'] = _stock_frame().to_csv(index=False).encode()
+    stand_in.delay = 0.3
+    datasets = [
+        DATASETS['sales']._replace(source=stand_in.url('vendas.csv')),
+        DATASETS['stock']._replace(source=stand_in.url('frota.csv')),
+        # Indicador opcional com a fonte fora do ar
+        DATASETS['sales_share']._replace(source=stand_in.url('participacao.csv')),
+    ]
+
+    results = fetch_datasets(datasets, tmp_path, force=True)
+    assert results['sales'] is True and results['stock'] is True
+    assert isinstance(results['sales_share'], Exception)
+
+    # Janelas das requisições se sobrepõem: os downloads rodaram ao mesmo tempo
+    starts = [start for _, _, start, _ in stand_in.requests]
+    ends = [end for _, _, _, end in stand_in.requests]
+    assert len(stand_in.requests) == 3
+    assert max(starts) < min(ends)
+
+    csv_path = tmp_path / DATASETS['sales'].filename
+    store = attach_metrics(load_shared_store(csv_path), datasets, tmp_path, csv_path=csv_path)
+    assert set(store.metrics) == {'stock'}
+
+    stock = store.metrics['stock']
+    entities = list(store.entities)
+    assert stock.values.shape == (len(store.entities), len(store.years))
+    china, world, brazil = entities.index('China'), entities.index('World'), entities.index('Brazil')
+    col = {year: year - store.year_min for year in YEARS}
+    assert stock.values[world, col[2023]] == 20230
+    assert stock.present[china, col[2018]] and not stock.present[china, col[2019]]
+    assert stock.values[china, col[2019]] == 0
+    assert not stock.present[brazil].any()
+    assert 'Atlantis' not in entities
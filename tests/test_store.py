@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from conftest import ENTITIES, YEARS, sales_frame
+from ev_dashboard.analytics import rolling_windows
+from ev_dashboard.data import load_clean_frame
+from ev_dashboard.forecast import fit_growth
+from ev_dashboard.store import compute_delta, load_shared_store
+
+
+def _reload(write_csv, df):
+    """Store do CSV original e o recarregado após trocar o CSV por `df`"""
+    path = write_csv(sales_frame())
+    old = load_shared_store(path)
+    write_csv(df)
+    return old, load_shared_store(path, previous=old)
+
+
+def _assert_consistent(store):
+    assert store.matrix.shape == (len(store.entities), len(store.years))
+    assert store.present.shape == store.matrix.shape
+    fit_growth(store)
+    rolling_windows(store, list(store.entities), 3, 'cagr')
+
+
+def test_delta_changed_values(write_csv):
+    df = sales_frame()
+    df.loc[(df['Entity'] == 'Brazil') & (df['Year'] == 2023), 'Electric cars sold'] += 1
+    old, new = _reload(write_csv, df)
+    assert new.delta is not None
+    assert list(new.delta.entities) == ['Brazil']
+    assert new.matrix[new.entity_index['Brazil'], -1] == old.matrix[old.entity_index['Brazil'], -1] + 1
+    _assert_consistent(new)
+
+
+def test_removed_entity_rebuilds(write_csv):
+    entities = {k: v for k, v in ENTITIES.items() if k != 'Australia'}
+    old, new = _reload(write_csv, sales_frame(entities=entities))
+    assert compute_delta(old, new._df) is None
+    assert new.delta is None
+    assert list(new.entities) == sorted(entities)
+    _assert_consistent(new)
+
+
+def test_removed_trailing_year_rebuilds(write_csv):
+    old, new = _reload(write_csv, sales_frame(years=YEARS[:-1]))
+    assert new.delta is None
+    assert new.year_max == YEARS[-2]
+    assert len(new.years) == new.matrix.shape[1] == len(YEARS) - 1
+    _assert_consistent(new)
+
+
+def test_added_year_rebuilds(write_csv):
+    old, new = _reload(write_csv, sales_frame(years=range(YEARS[0], YEARS[-1] + 2)))
+    assert new.delta is None
+    assert np.array_equal(new.years, np.arange(YEARS[0], YEARS[-1] + 2))
+    _assert_consistent(new)
+
+
+@pytest.mark.parametrize('cached', [False, True], ids=['csv', 'arrow'])
+def test_shared_frame_is_read_only(write_csv, cached):
+    path = write_csv(sales_frame())
+    df = load_clean_frame(path)
+    if cached:
+        df = load_clean_frame(path)  # segunda leitura: cache Arrow via memory-map
+    original = df.copy(deep=True)
+
+    with pytest.raises(ValueError):
+        df['Electric cars sold'].to_numpy()[0] = -1
+    with pytest.raises(ValueError):
+        df['Year'].to_numpy()[0] = 1900
+
+    # Frames derivados (filtros, colunas novas) nunca escrevem no compartilhado
+    derived = df[df['Year'] >= 2020]
+    derived.loc[:, 'Electric cars sold'] = 0
+    derived['extra'] = 1
+    column = df['Electric cars sold']
+    column.iloc[0] = -1
+    assert df.equals(original)
+
+
+@pytest.mark.parametrize('cached', [False, True], ids=['memory', 'mmap'])
+def test_store_arrays_are_read_only(write_csv, cached):
+    path = write_csv(sales_frame())
+    store = load_shared_store(path)
+    if cached:
+        store = load_shared_store(path)  # outro worker: arrays .npy via memory-map
+        assert isinstance(store.matrix, np.memmap)
+        # O frame de crescimento também é uma view dos arrays mapeados, sem cópia privada
+        assert isinstance(store.growth_pct, np.memmap)
+        assert np.shares_memory(store.growth_frame('China')['Crescimento %'].to_numpy(), store.growth_pct)
+
+    for name in store.SHARED_ARRAYS:
+        array = getattr(store, name)
+        assert not array.flags.writeable
+        with pytest.raises(ValueError):
+            array[(0,) * array.ndim] = 1
+    with pytest.raises(ValueError):
+        store.entities[0] = 'Mutated'
+
+    frame = store.growth_frame('China')
+    before = store.matrix.copy()
+    frame.loc[:, 'Electric cars sold'] = 0
+    assert np.array_equal(store.matrix, before)